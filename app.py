@@ -1,14 +1,259 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, make_response, send_from_directory, url_for
 from database import db
+import metrics
+from build_assets import load_manifest
+from collections import OrderedDict
+from functools import wraps
+import base64
+import csv
+import gzip
+import hashlib
+import io
 import json
+import os
+import queue
+import threading
+import time
 from datetime import datetime, date
 
 app = Flask(__name__)
 
+HISTORY_FIELDS = ('student_name', 'timestamp', 'status', 'entry_type')
+# Statuses offered by the dashboard's manual entry form
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+ASSET_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MAX_AGE = 365 * 24 * 3600
+GZIP_MIN_SIZE = 500
+
+# Hashed bundle written by build_assets.py; empty until it has been built
+asset_manifest = load_manifest(ASSET_DIR)
+
+@app.template_global()
+def asset_url(name):
+    """URL of the hashed bundle copy of a static asset, or the plain static file if it is not bundled"""
+    hashed = asset_manifest.get(name)
+    if hashed:
+        return url_for('serve_asset', filename=hashed)
+    return url_for('static', filename=name)
+
+def accepts_encoding(encoding):
+    return request.accept_encodings[encoding] > 0
+
+def gzip_body(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+def encoded_response(body: bytes, gzipped: bytes, etag: str, mimetype: str):
+    """Build a conditional response, sending the gzip copy to clients that accept it"""
+    if gzipped is not None and accepts_encoding('gzip'):
+        response = app.response_class(gzipped, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gzip'
+    else:
+        response = app.response_class(body, mimetype=mimetype)
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+class ResponseCache:
+    """LRU cache of rendered JSON responses, expired by TTL or by a change in the DB data generation"""
+    
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, generation):
+        """Return the cached (body, gzipped body, etag) for key if it is fresh for this generation"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['generation'] != generation or time.monotonic() - entry['created'] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['body'], entry['gzipped'], entry['etag']
+    
+    def put(self, key, generation, body: bytes):
+        etag = hashlib.sha1(body).hexdigest()
+        # Compress once here rather than on every hit
+        gzipped = gzip_body(body) if len(body) >= GZIP_MIN_SIZE else None
+        with self._lock:
+            self._entries[key] = {
+                'generation': generation, 'created': time.monotonic(),
+                'body': body, 'gzipped': gzipped, 'etag': etag
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body, gzipped, etag
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_cache = ResponseCache()
+
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    'attendance_response_cache_hits_total', 'Response cache hits', lambda: response_cache.hits, kind='counter'))
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    'attendance_response_cache_misses_total', 'Response cache misses', lambda: response_cache.misses, kind='counter'))
+metrics.REGISTRY.register(metrics.CallbackGauge(
+    'attendance_response_cache_hit_ratio', 'Share of response cache lookups that were hits',
+    lambda: response_cache.hits / max(1, response_cache.hits + response_cache.misses)))
+
+def cached_response(view):
+    """Serve a JSON view from response_cache, gzipped when accepted, answering If-None-Match with 304 when unchanged"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        generation = db.get_generation()
+        key = request.full_path
+        cached = response_cache.get(key, generation)
+        if cached is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            cached = response_cache.put(key, generation, response.get_data())
+        
+        return encoded_response(*cached, mimetype='application/json')
+    return wrapper
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.start_query_count()
+
+# Registered before compress_json so it runs after it, and the timing includes compression
+@app.after_request
+def record_request_metrics(response):
+    """Record latency and SQL statement count per endpoint; streamed bodies are timed until they start"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                             method=request.method, status=response.status_code)
+        metrics.HTTP_REQUEST_QUERIES.observe(metrics.query_count(), endpoint=endpoint)
+    return response
+
+@app.after_request
+def compress_json(response):
+    """Gzip uncached JSON API responses; streams and already-encoded responses are left alone"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers
+            or not accepts_encoding('gzip')):
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip_body(body))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+class ChangeBroadcaster:
+    """Polls the DB attendance change log once for all stream clients and fans new changes out to them"""
+    
+    def __init__(self, poll_interval: float = 1.0, client_queue_size: int = 1000):
+        self.poll_interval = poll_interval
+        self.client_queue_size = client_queue_size
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def subscribe(self) -> queue.Queue:
+        client = queue.Queue(maxsize=self.client_queue_size)
+        with self._lock:
+            self._clients.add(client)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return client
+    
+    def unsubscribe(self, client: queue.Queue):
+        with self._lock:
+            self._clients.discard(client)
+    
+    def _run(self):
+        last_id = db.get_latest_change_id()
+        last_generation = db.get_generation()
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._clients:
+                    self._thread = None
+                    return
+            # The generation counter is one primary-key read; only look at the
+            # change log when something was actually written
+            generation = db.get_generation()
+            if generation == last_generation:
+                continue
+            last_generation = generation
+            changes = db.get_changes_since(last_id)
+            while changes:
+                last_id = changes[-1]['id']
+                self._publish(changes)
+                changes = db.get_changes_since(last_id)
+    
+    def _publish(self, changes):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            for change in changes:
+                try:
+                    client.put_nowait(change)
+                except queue.Full:
+                    # Slow client: drop it so it reconnects and resumes from Last-Event-ID
+                    self.unsubscribe(client)
+                    self._disconnect(client)
+                    break
+    
+    @staticmethod
+    def _disconnect(client: queue.Queue):
+        """Replace a client's pending changes with the end-of-stream marker"""
+        while True:
+            try:
+                client.get_nowait()
+            except queue.Empty:
+                break
+        client.put_nowait(None)
+
+change_broadcaster = ChangeBroadcaster()
+
+# The page only changes when the template or asset bundle does, so it is rendered once
+_dashboard_page = None
+
 @app.route('/')
 def dashboard():
     """Main dashboard view"""
-    return render_template('dashboard.html')
+    global _dashboard_page
+    if _dashboard_page is None:
+        body = render_template('dashboard.html').encode('utf-8')
+        _dashboard_page = (body, gzip_body(body), hashlib.sha1(body).hexdigest())
+    return encoded_response(*_dashboard_page, mimetype='text/html')
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve a hashed bundle file, using its precompressed brotli or gzip copy when the client accepts it"""
+    mimetype = 'text/css' if filename.endswith('.css') else 'text/javascript'
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepts_encoding(encoding) and os.path.exists(os.path.join(ASSET_DIR, filename + suffix)):
+            response = send_from_directory(ASSET_DIR, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(ASSET_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms, query counts and cache hit rates in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/api/stats/<student_name>')
 def get_student_stats(student_name):
@@ -22,11 +267,12 @@ def get_student_stats(student_name):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats/all')
+@cached_response
 def get_all_stats():
     """Get statistics for all students"""
     try:
         all_stats = db.get_all_students_stats()
-        class_average = db.get_class_average_attendance()
+        class_average = db.get_class_average_attendance(all_stats)
         return jsonify({
             'students': all_stats,
             'class_average': class_average
@@ -54,34 +300,146 @@ def manual_attendance():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/attendance/manual/bulk', methods=['POST'])
+def manual_attendance_bulk():
+    """Manual attendance entry for many students in one request"""
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        students = data.get('students')
+        if not isinstance(students, list) or not students:
+            return jsonify({'error': 'students must be a non-empty list'}), 400
+        
+        default_status = data.get('status', 'present')
+        entries = []
+        for entry in students:
+            if isinstance(entry, dict):
+                student_name, status = entry.get('student_name'), entry.get('status', default_status)
+            else:
+                student_name, status = entry, default_status
+            if not isinstance(student_name, str) or not student_name.strip():
+                return jsonify({'error': 'Each student must be a name or an object with a student_name'}), 400
+            if status not in ATTENDANCE_STATUSES:
+                return jsonify({'error': f"Status must be one of {', '.join(ATTENDANCE_STATUSES)}"}), 400
+            entries.append((student_name, status))
+        
+        results = db.log_attendance_bulk(entries, 'manual')
+        return jsonify({
+            'logged': sum(1 for result in results if result['result'] == 'logged'),
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def encode_history_cursor(after):
+    """Opaque page token for a (timestamp, id) keyset cursor"""
+    return base64.urlsafe_b64encode(json.dumps(after).encode()).decode() if after else None
+
+def decode_history_cursor(token):
+    """Inverse of encode_history_cursor; raises ValueError for a token it did not produce"""
+    timestamp, row_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+    if not isinstance(timestamp, str):
+        raise ValueError("Malformed history cursor")
+    return timestamp, int(row_id)
+
 @app.route('/api/attendance/history')
 def get_attendance_history():
-    """Get attendance history with optional filters"""
+    """Get attendance history with optional filters.
+    
+    format=json (default) returns a JSON array, or one page plus next_cursor when
+    limit is given; format=ndjson and format=csv stream every row.
+    """
     try:
         student_name = request.args.get('student_name')
-        days = int(request.args.get('days', 30))
+        output_format = request.args.get('format', 'json')
+        limit = request.args.get('limit', type=int)
+        try:
+            days = int(request.args.get('days', 30))
+            after = decode_history_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'days must be a whole number and cursor a next_cursor value'}), 400
         
-        history = db.get_attendance_history(student_name, days)
-        return jsonify(history)
+        if output_format == 'ndjson':
+            rows = db.iter_attendance_history(student_name, days)
+            return Response((json.dumps(row) + '\n' for row in rows), mimetype='application/x-ndjson')
+        
+        if output_format == 'csv':
+            def generate_csv():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(HISTORY_FIELDS)
+                for row in db.iter_attendance_history(student_name, days):
+                    writer.writerow([row[field] for field in HISTORY_FIELDS])
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            return Response(generate_csv(), mimetype='text/csv', headers={
+                'Content-Disposition': 'attachment; filename=attendance_history.csv'
+            })
+        
+        if limit:
+            history, next_after = db.get_attendance_history_page(student_name, days, max(1, min(limit, 1000)), after)
+            return jsonify({'history': history, 'next_cursor': encode_history_cursor(next_after)})
+        
+        def generate_json():
+            yield '['
+            for index, row in enumerate(db.iter_attendance_history(student_name, days)):
+                yield (',' if index else '') + json.dumps(row)
+            yield ']'
+        return Response(generate_json(), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/attendance/stream')
+def stream_attendance():
+    """Server-sent events stream of attendance changes as they are written"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    client = change_broadcaster.subscribe()
+    
+    def format_event(change):
+        return f"id: {change['id']}\nevent: attendance\ndata: {json.dumps(change)}\n\n"
+    
+    def generate():
+        try:
+            # Replay anything missed since the client's last event, then follow live changes
+            last_sent = int(last_event_id) if last_event_id and last_event_id.isdigit() else db.get_latest_change_id()
+            changes = db.get_changes_since(last_sent)
+            while changes:
+                for change in changes:
+                    last_sent = change['id']
+                    yield format_event(change)
+                changes = db.get_changes_since(last_sent)
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    change = client.get(timeout=15)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if change is None:
+                    return
+                if change['id'] > last_sent:
+                    last_sent = change['id']
+                    yield format_event(change)
+        finally:
+            change_broadcaster.unsubscribe(client)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/students')
 def get_students():
     """Get list of all students"""
     try:
-        conn = db.db_path
-        import sqlite3
-        conn = sqlite3.connect(conn)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM students ORDER BY name")
-        students = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(students)
+        return jsonify(db.get_student_names())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/attendance/trends/<student_name>')
+@cached_response
 def get_attendance_trends(student_name):
     """Get attendance trends data for charts"""
     try:
@@ -118,11 +476,12 @@ def get_attendance_trends(student_name):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/attendance/summary')
+@cached_response
 def get_attendance_summary():
     """Get overall attendance summary for the dashboard"""
     try:
         all_stats = db.get_all_students_stats()
-        class_average = db.get_class_average_attendance()
+        class_average = db.get_class_average_attendance(all_stats)
         
         # Calculate summary statistics
         total_students = len(all_stats)
@@ -131,25 +490,15 @@ def get_attendance_summary():
         overall_percentage = (total_present_days / total_days * 100) if total_days > 0 else 0
         
         # Get today's attendance
-        today = date.today()
+        today_records = db.get_today_attendance()
         today_attendance = []
         for stats in all_stats:
             student_name = stats['student_name']
-            # Check if student was present today and get last marked time
-            history = db.get_attendance_history(student_name, 1)
-            present_today = False
-            last_marked_time = None
-            
-            for record in history:
-                if record['timestamp'].startswith(today.strftime('%Y-%m-%d')):
-                    present_today = record['status'] == 'present'
-                    last_marked_time = record['timestamp']
-                    break
-            
+            record = today_records.get(student_name)
             today_attendance.append({
                 'student_name': student_name,
-                'present': present_today,
-                'last_marked_time': last_marked_time
+                'present': bool(record) and record['status'] == 'present',
+                'last_marked_time': record['timestamp'] if record else None
             })
         
         summary = {
@@ -158,6 +507,7 @@ def get_attendance_summary():
             'total_days': total_days,
             'overall_percentage': round(overall_percentage, 2),
             'class_average': class_average,
+            'date': date.today().strftime('%Y-%m-%d'),
             'today_attendance': today_attendance
         }
         
@@ -0,0 +1,227 @@
+import json
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import metrics
+
+class AttendanceWriter(threading.Thread):
+    """Write-behind attendance logger: recognitions are spooled to disk and queued, and a
+    dedicated thread commits them to SQLite in batches so the camera loop never waits on the DB.
+
+    The spool is an append-only JSON-lines file replayed on start, so recognitions queued
+    before a crash are still logged. Replaying is safe because a student is only logged
+    once per day. Whenever everything in the spool has been handled it is rewritten to hold
+    just the recognitions that failed, for the next run to retry.
+
+    Each process needs its own spool: it is locked for the writer's lifetime, and a second
+    writer given the same path raises RuntimeError instead of erasing the first one's records.
+    """
+
+    def __init__(self, database=None, spool_path: str = "attendance_spool.jsonl", batch_size: int = 64,
+                 flush_interval: float = 0.5, initial_backoff: float = 0.05, max_backoff: float = 2.0):
+        super().__init__(daemon=True, name="attendance writer")
+        if database is None:
+            from database import db as database
+        self.db = database
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stop_event = threading.Event()
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._outstanding = 0
+        self._failed_records = []
+        self._lock_file = self._lock_spool()
+
+        # Metrics
+        self.logged = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.retries = 0
+        self.flushes = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.max_queue_depth = 0
+
+        # The process has one writer; its queue depth is read when metrics are rendered
+        metrics.REGISTRY.register(metrics.CallbackGauge(
+            'attendance_writer_queue_depth', 'Recognitions waiting for the write-behind writer',
+            lambda: self.queue_depth))
+
+        self.replayed = self._replay_spool()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'logged': self.logged,
+            'duplicates': self.duplicates,
+            'failed': self.failed,
+            'retries': self.retries,
+            'flushes': self.flushes,
+            'avg_flush_ms': 1000 * self.total_flush_time / self.flushes if self.flushes else 0.0,
+            'max_flush_ms': 1000 * self.max_flush_time,
+        }
+
+    def log(self, student_name, status='present'):
+        """Spool and queue one recognition; returns as soon as it is on disk"""
+        record = {
+            'student_name': student_name,
+            'status': status,
+            # UTC, in the same format as the attendance table's CURRENT_TIMESTAMP default
+            'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self._spool_lock:
+            with open(self.spool_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._outstanding += 1
+        self._enqueue(record)
+
+    def _lock_spool(self):
+        """Hold an exclusive lock on spool_path.lock so no other process shares the spool"""
+        lock_file = open(self.spool_path + ".lock", 'a')
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:
+                import msvcrt
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(f"{self.spool_path} is in use by another attendance writer; "
+                               f"give each recognizer its own --spool")
+        return lock_file
+
+    def _enqueue(self, record):
+        self._queue.put(record)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+    def _replay_spool(self):
+        """Queue recognitions left in the spool by a previous run"""
+        try:
+            with open(self.spool_path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+        replayed = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write
+                continue
+            if not isinstance(record, dict) or not {'student_name', 'status', 'timestamp'} <= record.keys():
+                continue
+            self._outstanding += 1
+            self._enqueue(record)
+            replayed += 1
+        if replayed:
+            print(f"📼 Replaying {replayed} spooled recognitions")
+        return replayed
+
+    def _next_batch(self):
+        """Wait for one record, then take whatever else is already queued up to batch_size"""
+        batch = [self._queue.get(timeout=self.flush_interval)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return
+                continue
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # The batch is still in the spool; keep the thread alive for the next one
+                print(f"❌ Attendance writer error: {e!r}")
+
+    def _flush(self, batch):
+        """Commit one batch, retrying with exponential backoff while the database is locked.
+        Any other error fails the batch, which stays in the spool, and the writer carries on."""
+        entries = [(r['student_name'], r['status'], r['timestamp']) for r in batch]
+        started = time.monotonic()
+        backoff = self.initial_backoff
+        while True:
+            try:
+                results = self.db.log_recognitions(entries)
+                break
+            except Exception as e:
+                if not (isinstance(e, sqlite3.OperationalError) and ('locked' in str(e) or 'busy' in str(e))):
+                    results = None
+                    print(f"❌ Error writing attendance, kept in {self.spool_path}: {e!r}")
+                    break
+                self.retries += 1
+                metrics.WRITER_RETRIES.inc()
+                time.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.max_backoff)
+
+        elapsed = time.monotonic() - started
+        self.flushes += 1
+        self.total_flush_time += elapsed
+        self.max_flush_time = max(self.max_flush_time, elapsed)
+        metrics.WRITER_FLUSH_SECONDS.observe(elapsed)
+
+        if results is None:
+            self.failed += len(batch)
+            metrics.WRITER_RECORDS.inc(len(batch), result='failed')
+        else:
+            for (student_name, _, _), logged in zip(entries, results):
+                if logged:
+                    self.logged += 1
+                    metrics.WRITER_RECORDS.inc(result='logged')
+                    print(f"📝 Attendance logged for {student_name}")
+                else:
+                    self.duplicates += 1
+                    metrics.WRITER_RECORDS.inc(result='duplicate')
+        self._committed(batch, failed=results is None)
+
+    def _committed(self, batch, failed=False):
+        """Mark a batch as handled; once nothing is outstanding, the spool is rewritten to hold
+        only the records that failed, for the next run to replay"""
+        with self._spool_lock:
+            self._outstanding -= len(batch)
+            if failed:
+                self._failed_records.extend(batch)
+            if self._outstanding == 0:
+                tmp_path = self.spool_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    f.writelines(json.dumps(record) + "\n" for record in self._failed_records)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.spool_path)
+
+    def close(self, timeout=None):
+        """Flush everything still queued, stop the writer thread and release the spool"""
+        self.stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        if not self.is_alive() and not self._lock_file.closed:
+            self._lock_file.close()
+
+    def summary(self):
+        m = self.metrics()
+        return (f"{m['logged']} logged, {m['duplicates']} already logged, {m['failed']} failed, "
+                f"{m['retries']} lock retries, {m['flushes']} flushes "
+                f"(avg {m['avg_flush_ms']:.1f} ms, max {m['max_flush_ms']:.1f} ms), "
+                f"max queue depth {m['max_queue_depth']}")
@@ -0,0 +1 @@
+"""Performance benchmarks for the attendance system. Run from the project root with `python -m benchmarks.<name>`."""
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+ANN index benchmark
+Compares recall@1 and per-query latency of the approximate IVFIndex against
+the exact FaceGallery on synthetic rosters.
+
+Synthetic embeddings are drawn around a set of cluster centres so they are
+less uniform than pure noise, and each query is a noisy copy of an enrolled
+face, standing in for a new photo of a known student.
+
+Usage: python -m benchmarks.ann_index [--sizes 10000 50000] [--probes 4 8 16 32]
+"""
+
+import argparse
+import time
+import numpy as np
+from face_index import FaceGallery, IVFIndex
+
+def synthetic_roster(size, dim=512, clusters=1024, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    members = centres[rng.integers(0, clusters, size)] + rng.normal(scale=3.0, size=(size, dim)).astype(np.float32)
+    return [f"student_{i}" for i in range(size)], members
+
+def time_queries(index, queries):
+    """Return (results, mean milliseconds per query) matching one query at a time, like the recognizer"""
+    start = time.perf_counter()
+    results = [index.match(query, threshold=2.0) for query in queries]
+    return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000], help='roster sizes')
+    parser.add_argument('--probes', type=int, nargs='+', default=[4, 8, 16, 32], help='IVF n_probe values')
+    parser.add_argument('--queries', type=int, default=200, help='queries per configuration')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    for size in args.sizes:
+        names, vectors = synthetic_roster(size)
+        picks = rng.integers(0, size, args.queries)
+        queries = vectors[picks] + rng.normal(scale=3.0, size=(args.queries, vectors.shape[1])).astype(np.float32)
+
+        gallery = FaceGallery(dict(zip(names, vectors)))
+        exact, exact_ms = time_queries(gallery, queries)
+        print(f"\n📊 {size} students — exact: {exact_ms:.3f} ms/query")
+
+        start = time.perf_counter()
+        index = IVFIndex.from_gallery(gallery)
+        build_s = time.perf_counter() - start
+        print(f"   IVF build ({len(index.centroids)} lists): {build_s:.2f} s")
+
+        for n_probe in args.probes:
+            index.n_probe = n_probe
+            approx, approx_ms = time_queries(index, queries)
+            recall = np.mean([a[0] == e[0] for a, e in zip(approx, exact)])
+            print(f"   n_probe={n_probe:<3} recall@1={recall:.3f}  {approx_ms:.3f} ms/query  "
+                  f"speedup {exact_ms / approx_ms:.1f}x")
+
+if __name__ == "__main__":
+    main()
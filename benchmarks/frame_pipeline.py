@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Frame pipeline benchmark
+Compares recognition throughput of the old temp.jpg round trip against
+passing the numpy frame straight to DeepFace.
+
+Usage: python -m benchmarks.frame_pipeline [--image Anshika.jpg] [--frames 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import cv2
+from deepface import DeepFace
+from main import embed_frame
+
+def embed_via_file(frame, path, model_name="Facenet512"):
+    """The original path: encode the frame to JPEG on disk and let DeepFace decode it again"""
+    cv2.imwrite(path, frame)
+    return DeepFace.represent(img_path=path, model_name=model_name)[0]['embedding']
+
+def time_frames(fn, frame, frames):
+    """Return frames per second for calling fn(frame) repeatedly"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn(frame)
+    return frames / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default='Anshika.jpg', help='photo used as the camera frame')
+    parser.add_argument('--frames', type=int, default=20, help='frames timed per pipeline')
+    args = parser.parse_args()
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        raise SystemExit(f"Could not read {args.image}")
+
+    # Warm up so model construction is not counted against either path
+    embed_frame(frame)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "frame.jpg")
+        file_fps = time_frames(lambda f: embed_via_file(f, path), frame, args.frames)
+    memory_fps = time_frames(embed_frame, frame, args.frames)
+
+    print(f"📁 File round trip: {file_fps:.2f} fps")
+    print(f"🧠 In-memory:       {memory_fps:.2f} fps")
+    print(f"⚡ Speedup:         {memory_fps / file_fps:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Hot path benchmark
+Builds synthetic rosters (random embeddings plus years of attendance rows) in a
+temporary database and times:
+  - matching a live embedding against the roster, exact and IVF, one at a time and batched
+  - log_attendance and log_recognitions (the write-behind path) throughput
+  - get_student_stats and get_all_students_stats
+  - every dashboard endpoint through the Flask test client, cached ones both cold and warm
+
+The DeepFace model itself is not timed; see benchmarks.startup for that.
+Results are written as JSON so runs can be compared; --compare reports timings
+that got slower than a previous run by more than --tolerance and exits non-zero.
+
+Runs in a temporary directory so the real attendance.db is not touched.
+
+Usage: python -m benchmarks.hot_paths [--sizes 10 1000 50000] [--output run.json] [--compare base.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from database import db
+from face_index import FaceGallery, IVFIndex
+
+def log(message):
+    print(message, file=sys.stderr)
+
+def measure(fn, repeat):
+    """Call fn repeat times and summarise the latencies in milliseconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    runs = np.array(runs)
+    return {
+        'runs': repeat,
+        'min_ms': round(float(runs.min()), 4),
+        'median_ms': round(float(np.median(runs)), 4),
+        'p95_ms': round(float(np.percentile(runs, 95)), 4),
+    }
+
+# ----------------- Synthetic Data -----------------
+def populate(conn, size, days, attendance_rate, max_rows, rng, dim=512):
+    """Insert size students with embeddings and up to max_rows attendance rows ending yesterday.
+    Returns (names, embedding matrix, attendance row count)."""
+    names = [f"student_{i:06d}" for i in range(size)]
+    vectors = rng.normal(size=(size, dim)).astype(np.float32)
+
+    # Large rosters get fewer days each so the database stays a manageable size
+    days_per_student = max(1, min(days, int(max_rows / (size * attendance_rate))))
+    start_day = date.today() - timedelta(days=days_per_student)
+
+    with conn:
+        conn.executemany("INSERT INTO students (name, photo_filename) VALUES (?, ?)",
+                         [(name, f"{name}.jpg") for name in names])
+        ids = [row[0] for row in conn.execute("SELECT id FROM students ORDER BY id")]
+        conn.executemany(
+            "INSERT INTO student_embeddings (student_id, model_name, model_version, embedding) VALUES (?, ?, ?, ?)",
+            [(student_id, 'Facenet512', 'synthetic', vector.tobytes()) for student_id, vector in zip(ids, vectors)]
+        )
+
+    rows = 0
+    for offset in range(days_per_student):
+        day = start_day + timedelta(days=offset)
+        present = np.flatnonzero(rng.random(size) < attendance_rate)
+        seconds = rng.integers(8 * 3600, 10 * 3600, len(present))
+        late = rng.random(len(present)) < 0.15
+        batch = [
+            (ids[i], (datetime.combine(day, datetime.min.time()) + timedelta(seconds=int(s))).strftime('%Y-%m-%d %H:%M:%S'),
+             'late' if is_late else 'present', 'automatic')
+            for i, s, is_late in zip(present, seconds, late)
+        ]
+        with conn:
+            conn.executemany("INSERT INTO attendance (student_id, timestamp, status, entry_type) VALUES (?, ?, ?, ?)",
+                             batch)
+        rows += len(batch)
+    return names, vectors, rows
+
+# ----------------- Benchmarks -----------------
+def bench_matching(names, vectors, repeat, rng):
+    queries = vectors[rng.integers(0, len(names), repeat)] + rng.normal(scale=0.3, size=(repeat, vectors.shape[1]))
+    queries = queries.astype(np.float32)
+    results = {}
+
+    start = time.perf_counter()
+    gallery = FaceGallery.from_rows(db.get_embeddings('Facenet512'))
+    results['load_gallery_from_db'] = {'ms': round((time.perf_counter() - start) * 1000, 4)}
+
+    matchers = {'exact': gallery}
+    if len(names) >= 1000:
+        start = time.perf_counter()
+        matchers['ivf'] = IVFIndex.from_gallery(gallery)
+        results['ivf_build'] = {'ms': round((time.perf_counter() - start) * 1000, 4)}
+
+    for label, matcher in matchers.items():
+        it = iter(queries)
+        results[f'match_{label}'] = measure(lambda: matcher.match(next(it)), repeat)
+        results[f'match_batch_{label}_16'] = measure(lambda: matcher.match_batch(queries[:16]), max(1, repeat // 4))
+    return results
+
+def bench_writes(names, sample):
+    """Throughput of logging attendance for students not yet logged today"""
+    results = {}
+    half = len(sample) // 2 or 1
+    direct, batched = sample[:half], sample[half:]
+
+    start = time.perf_counter()
+    for name in direct:
+        db.log_attendance(name, 'present', 'automatic')
+    elapsed = time.perf_counter() - start
+    results['log_attendance'] = {'calls': len(direct), 'per_second': round(len(direct) / elapsed, 1)}
+
+    if batched:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        entries = [(name, 'present', now) for name in batched]
+        start = time.perf_counter()
+        for i in range(0, len(entries), 64):
+            db.log_recognitions(entries[i:i + 64])
+        elapsed = time.perf_counter() - start
+        results['log_recognitions_batch_64'] = {'calls': len(entries), 'per_second': round(len(entries) / elapsed, 1)}
+    return results
+
+def bench_stats(names, repeat, rng):
+    picks = iter(rng.choice(names, repeat))
+    return {
+        'get_student_stats': measure(lambda: db.get_student_stats(next(picks)), repeat),
+        'get_all_students_stats': measure(db.get_all_students_stats, max(1, min(repeat, 5))),
+    }
+
+def bench_endpoints(names, repeat, rng):
+    from app import app, response_cache
+    client = app.test_client()
+    name = names[0]
+    endpoints = {
+        'GET /': '/',
+        'GET /api/students': '/api/students',
+        'GET /api/stats/<name>': f'/api/stats/{name}',
+        'GET /api/stats/all': '/api/stats/all',
+        'GET /api/attendance/summary': '/api/attendance/summary',
+        'GET /api/attendance/trends/<name>': f'/api/attendance/trends/{name}',
+        'GET /api/attendance/history?student_name': f'/api/attendance/history?student_name={name}&days=30',
+        'GET /api/attendance/history?limit=500': '/api/attendance/history?days=30&limit=500',
+        'GET /api/attendance/history?format=ndjson': '/api/attendance/history?days=7&format=ndjson',
+    }
+    if 'dashboard.html' not in app.jinja_env.list_templates():
+        # Flat checkout without the templates/ folder
+        del endpoints['GET /']
+    cached = {'GET /api/stats/all', 'GET /api/attendance/summary', 'GET /api/attendance/trends/<name>'}
+    heavy = {'GET /api/stats/all', 'GET /api/attendance/summary', 'GET /api/attendance/history?format=ndjson'}
+
+    results = {}
+    for label, url in endpoints.items():
+        runs = max(1, min(repeat, 5)) if label in heavy and len(names) > 1000 else repeat
+        status = client.get(url).status_code
+
+        def cold():
+            response_cache.clear()
+            client.get(url).get_data()
+
+        results[label] = dict(measure(cold, runs), status=status)
+        if label in cached:
+            results[label + ' (cached)'] = dict(measure(lambda: client.get(url).get_data(), repeat), status=status)
+
+    manual = iter(rng.choice(names, repeat))
+    results['POST /api/attendance/manual'] = measure(
+        lambda: client.post('/api/attendance/manual', json={'student_name': next(manual), 'status': 'present'}),
+        repeat
+    )
+    bulk = list(rng.choice(names, min(len(names), 100), replace=False))
+    results['POST /api/attendance/manual/bulk (100)'] = measure(
+        lambda: client.post('/api/attendance/manual/bulk', json={'status': 'present', 'students': bulk}),
+        max(1, repeat // 10)
+    )
+    response_cache.clear()
+    return results
+
+def run_size(size, args):
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "attendance.db")
+        db.use(path)
+        log(f"\n📦 {size} students: generating data...")
+        start = time.perf_counter()
+        names, vectors, rows = populate(db.get_connection(), size, args.days, args.attendance_rate, args.max_rows, rng)
+        log(f"   {rows} attendance rows in {time.perf_counter() - start:.1f} s")
+
+        result = {'students': size, 'attendance_rows': rows}
+        log("   matching...")
+        result['matching'] = bench_matching(names, vectors, args.repeat, rng)
+        log("   stats...")
+        result['stats'] = bench_stats(names, args.repeat, rng)
+        log("   endpoints...")
+        result['endpoints'] = bench_endpoints(names, args.repeat, rng)
+        log("   writes...")
+        sample = list(rng.choice(names, min(size, args.writes), replace=False))
+        result['writes'] = bench_writes(names, sample)
+        result['database_mb'] = round(os.path.getsize(path) / 2 ** 20, 1)
+        db.close()
+    return result
+
+# ----------------- Comparison -----------------
+def timings(results, prefix=()):
+    """Flatten results into {(size, section, name): median_ms} for every timed entry"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            if 'median_ms' in value:
+                flat[prefix + (key,)] = value['median_ms']
+            else:
+                flat.update(timings(value, prefix + (key,)))
+    return flat
+
+def compare(current, baseline, tolerance):
+    """Print entries slower than baseline by more than tolerance; returns how many there were"""
+    old = timings(baseline['results'])
+    regressions = 0
+    for key, new_ms in sorted(timings(current['results']).items()):
+        old_ms = old.get(key)
+        if old_ms and new_ms > old_ms * (1 + tolerance):
+            regressions += 1
+            log(f"🐢 {' / '.join(key)}: {old_ms:.3f} -> {new_ms:.3f} ms ({new_ms / old_ms:.2f}x)")
+    log(f"{'❌' if regressions else '✅'} {regressions} regressions beyond {tolerance:.0%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 50000], help='roster sizes')
+    parser.add_argument('--days', type=int, default=730, help='days of attendance history per student')
+    parser.add_argument('--attendance-rate', type=float, default=0.9, help='chance a student attends on a day')
+    parser.add_argument('--max-rows', type=int, default=2_000_000,
+                        help='cap on attendance rows per roster (large rosters get fewer days)')
+    parser.add_argument('--repeat', type=int, default=50, help='timed runs per operation')
+    parser.add_argument('--writes', type=int, default=1000, help='students logged in the write benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write JSON here instead of stdout')
+    parser.add_argument('--compare', help='previous JSON output to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before a regression')
+    args = parser.parse_args()
+
+    output = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+    }
+    # Progress and the database's own messages go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        output['results'] = {str(size): run_size(size, args) for size in args.sizes}
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+        log(f"\n✅ Results written to {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(output, json.load(f), args.tolerance) else 0)
+
+if __name__ == "__main__":
+    main()
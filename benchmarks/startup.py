@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Startup time benchmark
+Times, each in a fresh interpreter:
+  - importing the Flask app, the database module and the recognizer module
+  - the first database call (opening and migrating a new database)
+  - recognizer warm-up, and the first frame embedding with and without it
+
+Runs in a temporary directory so the real attendance.db is not touched.
+
+Usage: python -m benchmarks.startup [--repeat 3] [--skip-model]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'import app': "import app",
+    'import database': "import database",
+    'import main': "import main",
+    'first db call': "from database import db; db.get_student_names()",
+}
+
+FIRST_EMBED = "main.embed_crop(np.zeros((160, 160, 3), np.uint8), {'x': 0, 'y': 0, 'w': 160, 'h': 160})"
+
+MODEL_SCENARIOS = {
+    'warm_up()': "import main; main.warm_up()",
+    'first embed (cold)': f"import main, numpy as np; {FIRST_EMBED}",
+    # Reset the clock after warm-up so only the first real embedding is timed
+    'first embed (warm)': f"import main, numpy as np; main.warm_up(); _start = time.perf_counter(); {FIRST_EMBED}",
+}
+
+def time_snippet(snippet, cwd):
+    """Run snippet in a new interpreter and return the seconds it took, measured inside that interpreter"""
+    code = f"import time; _start = time.perf_counter()\n{snippet}\nprint(time.perf_counter() - _start)"
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario (the best is reported)')
+    parser.add_argument('--skip-model', action='store_true', help='skip scenarios that load the DeepFace model')
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if not args.skip_model:
+        scenarios.update(MODEL_SCENARIOS)
+
+    for label, snippet in scenarios.items():
+        runs = []
+        for _ in range(args.repeat):
+            # A fresh directory per run so every "first db call" creates and migrates a new database
+            with tempfile.TemporaryDirectory() as cwd:
+                runs.append(time_snippet(snippet, cwd))
+        print(f"⏱️  {label:<20} {min(runs) * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Dashboard Asset Bundle
+Minifies style.css and charts.js, writes them under content-hashed filenames
+together with gzip (and, if the brotli package is installed, brotli) copies,
+and records the hashed names in a manifest the dashboard reads at startup.
+
+Hashed files never change, so the server can mark them immutable and browsers
+only download them again after a rebuild. Run this after editing either file.
+
+Usage: python build_assets.py [--output static/dist]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(ROOT, "static", "dist")
+MANIFEST_NAME = "manifest.json"
+
+# Logical name used in the template -> file name of the source
+ASSETS = {
+    'css/style.css': 'style.css',
+    'js/charts.js': 'charts.js',
+}
+
+def minify_css(text):
+    """Drop comments and the whitespace around CSS punctuation"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+def minify_js(text):
+    """Drop comment-only lines, indentation and blank lines. Line breaks are kept so
+    automatic semicolon insertion behaves exactly as in the source."""
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def find_source(logical_name, static_folder=None):
+    """Prefer the copy in the app's static folder, falling back to the one next to this script"""
+    candidates = [os.path.join(ROOT, ASSETS[logical_name])]
+    if static_folder:
+        candidates.insert(0, os.path.join(static_folder, logical_name))
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No source found for {logical_name}")
+
+def compress(data):
+    """Return {encoding: compressed bytes} for every encoding available here"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants['br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    return variants
+
+def build(output=DEFAULT_OUTPUT, static_folder=None):
+    """Write every asset and its compressed copies to output. Returns the manifest"""
+    os.makedirs(output, exist_ok=True)
+    manifest = {}
+    for logical_name in ASSETS:
+        with open(find_source(logical_name, static_folder), encoding='utf-8') as f:
+            text = f.read()
+        stem, ext = os.path.splitext(os.path.basename(logical_name))
+        data = MINIFIERS[ext](text).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        filename = f"{stem}.{digest}{ext}"
+
+        with open(os.path.join(output, filename), 'wb') as f:
+            f.write(data)
+        for encoding, compressed in compress(data).items():
+            suffix = '.gz' if encoding == 'gzip' else '.br'
+            with open(os.path.join(output, filename + suffix), 'wb') as f:
+                f.write(compressed)
+        manifest[logical_name] = filename
+        print(f"📦 {logical_name} -> {filename} ({len(text.encode('utf-8'))} -> {len(data)} bytes)")
+
+    tmp_path = os.path.join(output, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output, MANIFEST_NAME))
+    return manifest
+
+def load_manifest(output=DEFAULT_OUTPUT):
+    """Return {logical name: hashed filename}, or {} if the bundle has not been built"""
+    try:
+        with open(os.path.join(output, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='directory for the bundle')
+    parser.add_argument('--static-folder', default=None, help='read sources from this static folder first')
+    args = parser.parse_args()
+
+    manifest = build(args.output, args.static_folder)
+    print(f"✅ Built {len(manifest)} assets into {args.output}")
+
+if __name__ == "__main__":
+    main()
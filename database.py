@@ -1,16 +1,357 @@
 import sqlite3
+import json
 import os
+import threading
+import time
+import metrics
 from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
 
+# Rollup tables kept in step with attendance by triggers, as
+# (table, key column, key expression over a row alias)
+ROLLUPS = (
+    ('attendance_daily', 'day', "DATE({row}.timestamp)"),
+    ('attendance_monthly', 'month', "strftime('%Y-%m', {row}.timestamp)"),
+    ('attendance_weekly', 'week', "strftime('%Y-W%W', {row}.timestamp)"),
+)
+
+# Only the newest CHANGE_LOG_SIZE attendance changes are kept, which bounds how far
+# back a reconnecting stream client can resume from its Last-Event-ID
+CHANGE_LOG_SIZE = 10000
+
+def _rollup_add(table: str, key: str, expr: str, row: str) -> str:
+    """SQL that counts one attendance row (NEW or OLD) into a rollup table"""
+    key_expr = expr.format(row=row)
+    return f'''
+        INSERT INTO {table} (student_id, {key}, records, present, late)
+        SELECT {row}.student_id, {key_expr}, 1,
+               {row}.status = 'present',
+               {row}.status = 'present' AND strftime('%H', {row}.timestamp) > '09'
+        WHERE {row}.student_id IS NOT NULL AND {key_expr} IS NOT NULL
+        ON CONFLICT (student_id, {key}) DO UPDATE SET
+            records = records + excluded.records,
+            present = present + excluded.present,
+            late = late + excluded.late;
+    '''
+
+def _rollup_remove(table: str, key: str, expr: str, row: str) -> str:
+    """SQL that takes one attendance row back out of a rollup table"""
+    key_expr = expr.format(row=row)
+    return f'''
+        UPDATE {table} SET
+            records = records - 1,
+            present = present - ({row}.status = 'present'),
+            late = late - ({row}.status = 'present' AND strftime('%H', {row}.timestamp) > '09')
+        WHERE student_id = {row}.student_id AND {key} = {key_expr};
+        DELETE FROM {table} WHERE student_id = {row}.student_id AND {key} = {key_expr} AND records <= 0;
+    '''
+
+def _rollup_rebuild_statements() -> List[str]:
+    """Statements that regenerate every rollup table from the raw attendance rows"""
+    statements = []
+    for table, key, expr in ROLLUPS:
+        key_expr = expr.format(row='a')
+        statements.append(f"DELETE FROM {table}")
+        statements.append(f'''
+            INSERT INTO {table} (student_id, {key}, records, present, late)
+            SELECT a.student_id, {key_expr}, COUNT(*),
+                   SUM(a.status = 'present'),
+                   SUM(a.status = 'present' AND strftime('%H', a.timestamp) > '09')
+            FROM attendance a
+            WHERE a.student_id IS NOT NULL AND {key_expr} IS NOT NULL
+            GROUP BY a.student_id, {key_expr}
+        ''')
+    return statements
+
+def _rollup_migration() -> List[str]:
+    """Create the rollup tables and triggers, then backfill them"""
+    statements = [
+        f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                student_id INTEGER NOT NULL,
+                {key} TEXT NOT NULL,
+                records INTEGER NOT NULL DEFAULT 0,
+                present INTEGER NOT NULL DEFAULT 0,
+                late INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (student_id, {key})
+            ) WITHOUT ROWID
+        '''
+        for table, key, _ in ROLLUPS
+    ]
+    add_new = "".join(_rollup_add(table, key, expr, 'NEW') for table, key, expr in ROLLUPS)
+    remove_old = "".join(_rollup_remove(table, key, expr, 'OLD') for table, key, expr in ROLLUPS)
+    statements += [
+        f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_insert AFTER INSERT ON attendance BEGIN {add_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_delete AFTER DELETE ON attendance BEGIN {remove_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS attendance_rollup_update AFTER UPDATE OF student_id, timestamp, status "
+        f"ON attendance BEGIN {remove_old} {add_new} END",
+    ]
+    return statements + _rollup_rebuild_statements()
+
+def _counter_refresh(row: str) -> str:
+    """SQL that recomputes one student's last present, last break and streak from their raw rows.
+    The counter row is created first if a moved attendance row is the student's first, and
+    dropped afterwards if they have no attendance left, as a rebuild would leave it"""
+    return f'''
+        INSERT INTO student_counters (student_id) SELECT {row}.student_id WHERE {row}.student_id IS NOT NULL
+        ON CONFLICT (student_id) DO NOTHING;
+        UPDATE student_counters SET
+            last_present = (SELECT MAX(timestamp) FROM attendance
+                            WHERE student_id = {row}.student_id AND status = 'present'),
+            last_break = (SELECT MAX(timestamp) FROM attendance
+                          WHERE student_id = {row}.student_id AND status != 'present')
+        WHERE student_id = {row}.student_id;
+        UPDATE student_counters SET
+            current_streak = (SELECT COUNT(*) FROM attendance a
+                              WHERE a.student_id = student_counters.student_id AND a.status = 'present'
+                              AND (student_counters.last_break IS NULL OR a.timestamp > student_counters.last_break))
+        WHERE student_id = {row}.student_id;
+        DELETE FROM student_counters WHERE student_id = {row}.student_id
+        AND NOT EXISTS (SELECT 1 FROM attendance WHERE student_id = {row}.student_id);
+    '''
+
+def _counter_rebuild_statements() -> List[str]:
+    """Statements that regenerate every student's counters in one pass over the daily rollup and attendance"""
+    return [
+        "DELETE FROM student_counters",
+        '''
+            INSERT INTO student_counters (student_id, total_days, present_days, late_arrivals)
+            SELECT student_id, COUNT(*), SUM(present), SUM(late)
+            FROM attendance_daily
+            GROUP BY student_id
+        ''',
+        '''
+            INSERT INTO student_counters (student_id)
+            SELECT DISTINCT student_id FROM attendance WHERE student_id IS NOT NULL
+            ON CONFLICT (student_id) DO NOTHING
+        ''',
+        '''
+            UPDATE student_counters SET
+                last_present = (SELECT MAX(timestamp) FROM attendance a
+                                WHERE a.student_id = student_counters.student_id AND a.status = 'present'),
+                last_break = (SELECT MAX(timestamp) FROM attendance a
+                              WHERE a.student_id = student_counters.student_id AND a.status != 'present')
+        ''',
+        '''
+            UPDATE student_counters SET
+                current_streak = (SELECT COUNT(*) FROM attendance a
+                                  WHERE a.student_id = student_counters.student_id AND a.status = 'present'
+                                  AND (student_counters.last_break IS NULL OR a.timestamp > student_counters.last_break))
+        ''',
+    ]
+
+def _counter_migration() -> List[str]:
+    """Create the per-student counters and their triggers, then backfill them.
+    
+    Day totals follow the daily rollup through triggers on attendance_daily. The streak,
+    last present and last break timestamps follow attendance: a row appended after the
+    student's last break only touches their counter row, and a new break counts the present
+    rows after it through idx_attendance_student_day. Deletes and updates, which are rare
+    corrections, recompute the affected students.
+    """
+    return [
+        '''
+            CREATE TABLE IF NOT EXISTS student_counters (
+                student_id INTEGER PRIMARY KEY,
+                total_days INTEGER NOT NULL DEFAULT 0,
+                present_days INTEGER NOT NULL DEFAULT 0,
+                late_arrivals INTEGER NOT NULL DEFAULT 0,
+                current_streak INTEGER NOT NULL DEFAULT 0,
+                last_present DATETIME,
+                last_break DATETIME
+            )
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS student_counters_daily_insert AFTER INSERT ON attendance_daily BEGIN
+                INSERT INTO student_counters (student_id, total_days, present_days, late_arrivals)
+                VALUES (NEW.student_id, 1, NEW.present, NEW.late)
+                ON CONFLICT (student_id) DO UPDATE SET
+                    total_days = total_days + 1,
+                    present_days = present_days + excluded.present_days,
+                    late_arrivals = late_arrivals + excluded.late_arrivals;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS student_counters_daily_update AFTER UPDATE ON attendance_daily BEGIN
+                UPDATE student_counters SET
+                    present_days = present_days + NEW.present - OLD.present,
+                    late_arrivals = late_arrivals + NEW.late - OLD.late
+                WHERE student_id = NEW.student_id;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS student_counters_daily_delete AFTER DELETE ON attendance_daily BEGIN
+                UPDATE student_counters SET
+                    total_days = total_days - 1,
+                    present_days = present_days - OLD.present,
+                    late_arrivals = late_arrivals - OLD.late
+                WHERE student_id = OLD.student_id;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS student_counters_insert AFTER INSERT ON attendance
+            WHEN NEW.student_id IS NOT NULL BEGIN
+                INSERT INTO student_counters (student_id) VALUES (NEW.student_id)
+                ON CONFLICT (student_id) DO NOTHING;
+                UPDATE student_counters SET
+                    current_streak = current_streak + (last_break IS NULL OR IFNULL(NEW.timestamp > last_break, 0)),
+                    last_present = CASE WHEN last_present IS NULL OR NEW.timestamp > last_present
+                                        THEN NEW.timestamp ELSE last_present END
+                WHERE student_id = NEW.student_id AND NEW.status = 'present';
+                UPDATE student_counters SET
+                    last_break = NEW.timestamp,
+                    current_streak = (SELECT COUNT(*) FROM attendance
+                                      WHERE student_id = NEW.student_id AND day >= DATE(NEW.timestamp)
+                                      AND status = 'present' AND timestamp > NEW.timestamp)
+                WHERE student_id = NEW.student_id AND NEW.status != 'present' AND NEW.timestamp IS NOT NULL
+                AND (last_break IS NULL OR NEW.timestamp > last_break);
+            END
+        ''',
+        f'''
+            CREATE TRIGGER IF NOT EXISTS student_counters_delete AFTER DELETE ON attendance
+            WHEN OLD.student_id IS NOT NULL BEGIN {_counter_refresh('OLD')} END
+        ''',
+        f'''
+            CREATE TRIGGER IF NOT EXISTS student_counters_update AFTER UPDATE OF student_id, timestamp, status
+            ON attendance BEGIN {_counter_refresh('OLD')} {_counter_refresh('NEW')} END
+        ''',
+    ] + _counter_rebuild_statements()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports every statement's execution time to metrics"""
+    
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start)
+    
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record_query(sql, time.perf_counter() - start)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the implicit ones behind conn.execute, are instrumented"""
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+@metrics.instrument_methods(metrics.DB_METHOD_SECONDS, exclude=('get_connection', 'close'))
 class AttendanceDB:
-    def __init__(self, db_path: str = "attendance.db"):
+    # Pragmas applied to every pooled connection
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA cache_size = -16000",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA foreign_keys = ON",
+    )
+
+    # Schema migrations as (version, description, statements), applied in order on
+    # top of the base tables. PRAGMA user_version records the last one applied.
+    MIGRATIONS = [
+        (1, "Index attendance by student, day and entry type, and by timestamp", [
+            "ALTER TABLE attendance ADD COLUMN day DATE GENERATED ALWAYS AS (DATE(timestamp)) VIRTUAL",
+            "CREATE INDEX IF NOT EXISTS idx_attendance_student_day ON attendance (student_id, day, entry_type, status)",
+            "CREATE INDEX IF NOT EXISTS idx_attendance_timestamp ON attendance (timestamp)",
+        ]),
+        (2, "Add daily, monthly and weekly attendance rollups maintained by triggers", _rollup_migration()),
+        (3, "Add a data generation counter bumped on every attendance or student change", [
+            "CREATE TABLE IF NOT EXISTS data_generation (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL)",
+            "INSERT OR IGNORE INTO data_generation (id, generation) VALUES (1, 0)",
+        ] + [
+            f"CREATE TRIGGER IF NOT EXISTS {table}_generation_{event.lower()} AFTER {event} ON {table} "
+            f"BEGIN UPDATE data_generation SET generation = generation + 1 WHERE id = 1; END"
+            for table in ('attendance', 'students')
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+        ]),
+        (4, "Add an attendance change log for live dashboard updates", [
+            '''
+                CREATE TABLE IF NOT EXISTS attendance_changes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    change TEXT NOT NULL,
+                    attendance_id INTEGER NOT NULL,
+                    student_id INTEGER,
+                    timestamp DATETIME,
+                    status TEXT,
+                    entry_type TEXT
+                )
+            ''',
+        ] + [
+            f"CREATE TRIGGER IF NOT EXISTS attendance_changes_{event.lower()} AFTER {event} ON attendance BEGIN "
+            f"INSERT INTO attendance_changes (change, attendance_id, student_id, timestamp, status, entry_type) "
+            f"VALUES ('{event.lower()}', {row}.id, {row}.student_id, {row}.timestamp, {row}.status, {row}.entry_type); END"
+            for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD'))
+        ] + [
+            # Pruned as changes are written, by whichever process writes them
+            f"CREATE TRIGGER IF NOT EXISTS attendance_changes_prune AFTER INSERT ON attendance_changes BEGIN "
+            f"DELETE FROM attendance_changes WHERE id <= NEW.id - {CHANGE_LOG_SIZE}; END",
+        ]),
+        (5, "Store face embeddings per student and model", [
+            '''
+                CREATE TABLE IF NOT EXISTS student_embeddings (
+                    student_id INTEGER NOT NULL,
+                    model_name TEXT NOT NULL,
+                    model_version TEXT NOT NULL DEFAULT '',
+                    embedding BLOB NOT NULL,
+                    photo_filename TEXT,
+                    photo_folder TEXT,
+                    photo_size INTEGER,
+                    photo_mtime_ns INTEGER,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (student_id, model_name),
+                    FOREIGN KEY (student_id) REFERENCES students (id) ON DELETE CASCADE
+                ) WITHOUT ROWID
+            ''',
+        ]),
+        (6, "Keep per-student day totals, late arrivals, streak and last present date as counters",
+         _counter_migration()),
+    ]
+
+    def __init__(self, db_path: str = "attendance.db", busy_timeout: float = 10.0, cached_statements: int = 256):
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
         self.init_database()
     
+    def get_connection(self) -> sqlite3.Connection:
+        """Return this thread's pooled connection, opening it on first use (and again after a fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            factory=InstrumentedConnection
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def close(self):
+        """Close the calling thread's pooled connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
     def init_database(self):
         """Initialize the database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         # Create students table
@@ -36,32 +377,47 @@ class AttendanceDB:
         ''')
         
         conn.commit()
-        conn.close()
+        self.migrate()
+    
+    def migrate(self):
+        """Apply any schema migrations newer than the database's user_version"""
+        conn = self.get_connection()
+        for version, description, statements in self.MIGRATIONS:
+            # BEGIN IMMEDIATE takes the write lock first, so two processes starting
+            # together cannot both apply the same migration
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version > current:
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {version}")
+                    print(f"Applied database migration {version}: {description}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
     
     def add_student(self, name: str, photo_filename: str = None) -> int:
         """Add a new student to the database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
-        try:
+        with conn:
             cursor.execute(
-                "INSERT INTO students (name, photo_filename) VALUES (?, ?)",
+                "INSERT OR IGNORE INTO students (name, photo_filename) VALUES (?, ?)",
                 (name, photo_filename)
             )
-            student_id = cursor.lastrowid
-            conn.commit()
-            return student_id
-        except sqlite3.IntegrityError:
+            if cursor.rowcount:
+                return cursor.lastrowid
             # Student already exists, get their ID
             cursor.execute("SELECT id FROM students WHERE name = ?", (name,))
             result = cursor.fetchone()
             return result[0] if result else None
-        finally:
-            conn.close()
     
     def log_attendance(self, student_name: str, status: str = 'present', entry_type: str = 'automatic') -> bool:
         """Log attendance for a student"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -70,34 +426,256 @@ class AttendanceDB:
             if not student_id:
                 return False
             
-            # Check if already logged today
+            # Log attendance unless already logged today; the NOT EXISTS
+            # check is an index probe on idx_attendance_student_day
             today = date.today()
-            cursor.execute('''
-                SELECT id FROM attendance 
-                WHERE student_id = ? AND DATE(timestamp) = ? AND entry_type = ?
-            ''', (student_id, today, entry_type))
+            with conn:
+                cursor.execute('''
+                    INSERT INTO attendance (student_id, status, entry_type) 
+                    SELECT ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM attendance 
+                        WHERE student_id = ? AND day = ? AND entry_type = ?
+                    )
+                ''', (student_id, status, entry_type, student_id, today, entry_type))
             
-            if cursor.fetchone():
+            if not cursor.rowcount:
                 print(f"Attendance already logged for {student_name} today")
                 return False
             
-            # Log attendance
-            cursor.execute('''
-                INSERT INTO attendance (student_id, status, entry_type) 
-                VALUES (?, ?, ?)
-            ''', (student_id, status, entry_type))
-            
-            conn.commit()
             return True
         except Exception as e:
             print(f"Error logging attendance: {e}")
             return False
-        finally:
-            conn.close()
+    
+    def log_attendance_bulk(self, entries: List[Tuple[str, str]], entry_type: str = 'manual') -> List[Dict]:
+        """Log attendance for many (student_name, status) pairs in one transaction, reporting each outcome"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        today = date.today()
+        names = list(dict.fromkeys(name for name, _ in entries))
+        results = []
+        
+        try:
+            with conn:
+                # Create missing students, then resolve every name to an id in one query
+                cursor.executemany("INSERT OR IGNORE INTO students (name) VALUES (?)", [(name,) for name in names])
+                cursor.execute(
+                    "SELECT name, id FROM students WHERE name IN (SELECT value FROM json_each(?))",
+                    (json.dumps(names),)
+                )
+                student_ids = dict(cursor.fetchall())
+                
+                # Students already logged today with this entry type
+                cursor.execute('''
+                    SELECT DISTINCT student_id FROM attendance 
+                    WHERE day = ? AND entry_type = ?
+                    AND student_id IN (SELECT value FROM json_each(?))
+                ''', (today, entry_type, json.dumps(list(student_ids.values()))))
+                logged_ids = {row[0] for row in cursor.fetchall()}
+                
+                rows = []
+                for name, status in entries:
+                    student_id = student_ids.get(name)
+                    if student_id is None:
+                        results.append({'student_name': name, 'status': status, 'result': 'error'})
+                    elif student_id in logged_ids:
+                        results.append({'student_name': name, 'status': status, 'result': 'already_logged'})
+                    else:
+                        logged_ids.add(student_id)
+                        rows.append((student_id, status, entry_type))
+                        results.append({'student_name': name, 'status': status, 'result': 'logged'})
+                
+                cursor.executemany('''
+                    INSERT INTO attendance (student_id, status, entry_type) 
+                    VALUES (?, ?, ?)
+                ''', rows)
+            return results
+        except Exception as e:
+            print(f"Error logging bulk attendance: {e}")
+            return [{'student_name': name, 'status': status, 'result': 'error'} for name, status in entries]
+    
+    def log_recognitions(self, entries: List[Tuple[str, str, str]], entry_type: str = 'automatic') -> List[bool]:
+        """Log (student_name, status, timestamp) recognitions in one transaction, keeping their original
+        timestamps. Returns whether each was logged or was already logged that day.
+        
+        Unlike the other log methods this raises sqlite3 errors, so a caller such as
+        AttendanceWriter can retry the whole batch when the database is locked.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        names = list(dict.fromkeys(name for name, _, _ in entries))
+        results = []
+        
+        with conn:
+            cursor.executemany("INSERT OR IGNORE INTO students (name) VALUES (?)", [(name,) for name in names])
+            cursor.execute(
+                "SELECT name, id FROM students WHERE name IN (SELECT value FROM json_each(?))",
+                (json.dumps(names),)
+            )
+            student_ids = dict(cursor.fetchall())
+            for name, status, timestamp in entries:
+                student_id = student_ids[name]
+                cursor.execute('''
+                    INSERT INTO attendance (student_id, timestamp, status, entry_type) 
+                    SELECT ?, ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM attendance 
+                        WHERE student_id = ? AND day = DATE(?) AND entry_type = ?
+                    )
+                ''', (student_id, timestamp, status, entry_type, student_id, timestamp, entry_type))
+                results.append(bool(cursor.rowcount))
+        return results
+    
+    def enroll_students(self, records: List[Dict], model_name: str, model_version: str = '') -> int:
+        """Add or update students and their embeddings in one transaction.
+        
+        Each record has student_name, photo_filename, embedding (float32 bytes) and
+        optionally photo_folder (absolute path) / photo_size / photo_mtime_ns. Returns the number of records written.
+        """
+        conn = self.get_connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO students (name, photo_filename) VALUES (?, ?)
+                ON CONFLICT (name) DO UPDATE SET photo_filename = excluded.photo_filename
+            ''', [(record['student_name'], record['photo_filename']) for record in records])
+            conn.executemany('''
+                INSERT OR REPLACE INTO student_embeddings
+                    (student_id, model_name, model_version, embedding, photo_filename, photo_folder,
+                     photo_size, photo_mtime_ns)
+                SELECT id, ?, ?, ?, ?, ?, ?, ? FROM students WHERE name = ?
+            ''', [
+                (model_name, model_version, record['embedding'], record['photo_filename'], record.get('photo_folder'),
+                 record.get('photo_size'), record.get('photo_mtime_ns'), record['student_name'])
+                for record in records
+            ])
+        return len(records)
+    
+    def get_enrolled_photos(self, model_name: str, model_version: str = None) -> Dict[str, Tuple[int, int]]:
+        """Get {photo_filename: (photo_size, photo_mtime_ns)} for photos already embedded with model_name,
+        and with model_version when given, so photos embedded by another version are embedded again"""
+        cursor = self.get_connection().cursor()
+        query = '''
+            SELECT photo_filename, photo_size, photo_mtime_ns FROM student_embeddings
+            WHERE model_name = ? AND photo_filename IS NOT NULL
+        '''
+        params = [model_name]
+        if model_version is not None:
+            query += " AND model_version = ?"
+            params.append(model_version)
+        cursor.execute(query, params)
+        return {filename: (size, mtime_ns) for filename, size, mtime_ns in cursor.fetchall()}
+    
+    def remove_missing_photos(self, model_name: str, photo_folder: str, photo_filenames: List[str]) -> int:
+        """Delete model_name embeddings enrolled from photo_folder whose photo is not in photo_filenames.
+        Embeddings enrolled from other folders are never touched. Returns how many were deleted"""
+        conn = self.get_connection()
+        with conn:
+            cursor = conn.execute('''
+                DELETE FROM student_embeddings
+                WHERE model_name = ? AND photo_folder = ? AND photo_filename IS NOT NULL
+                AND photo_filename NOT IN (SELECT value FROM json_each(?))
+            ''', (model_name, photo_folder, json.dumps(list(photo_filenames))))
+        return cursor.rowcount
+    
+    def get_embeddings(self, model_name: str, model_version: str = None) -> List[Tuple[str, bytes]]:
+        """Get (student_name, float32 embedding bytes) for every student embedded with model_name,
+        and with model_version when given"""
+        cursor = self.get_connection().cursor()
+        query = '''
+            SELECT s.name, e.embedding
+            FROM student_embeddings e
+            JOIN students s ON e.student_id = s.id
+            WHERE e.model_name = ?
+        '''
+        params = [model_name]
+        if model_version is not None:
+            query += " AND e.model_version = ?"
+            params.append(model_version)
+        cursor.execute(query + " ORDER BY s.name", params)
+        return cursor.fetchall()
+    
+    def _compute_stats(self, cursor, student_id: int = None) -> List[Dict]:
+        """Compute statistics for one student or, when student_id is None, every student in four set-based queries"""
+        student_filter = "WHERE s.id = ?" if student_id is not None else ""
+        attendance_filter = "AND student_id = ?" if student_id is not None else ""
+        params = (student_id,) if student_id is not None else ()
+        
+        # Totals, late arrivals, streak and last present date from the per-student counters
+        cursor.execute(f'''
+            SELECT s.id, s.name,
+                   COALESCE(c.present_days, 0),
+                   COALESCE(c.total_days, 0),
+                   COALESCE(c.late_arrivals, 0),
+                   COALESCE(c.current_streak, 0),
+                   DATE(c.last_present)
+            FROM students s
+            LEFT JOIN student_counters c ON c.student_id = s.id
+            {student_filter}
+            ORDER BY s.name
+        ''', params)
+        totals = cursor.fetchall()
+        
+        # Recent attendance (last 30 days)
+        recent = {}
+        cursor.execute(f'''
+            SELECT student_id, DATE(timestamp), status FROM attendance 
+            WHERE timestamp >= datetime('now', '-30 days') {attendance_filter}
+            ORDER BY student_id, timestamp DESC
+        ''', params)
+        for sid, day, status in cursor.fetchall():
+            recent.setdefault(sid, []).append((day, status))
+        
+        # Monthly breakdown from the monthly rollup
+        monthly = {}
+        cursor.execute(f'''
+            SELECT student_id, month, records, present
+            FROM attendance_monthly
+            WHERE 1 = 1 {attendance_filter}
+            ORDER BY student_id, month DESC
+        ''', params)
+        for sid, month, days, present in cursor.fetchall():
+            monthly.setdefault(sid, []).append((month, days, present))
+        
+        # Weekly data (last 84 days): whole weeks from the weekly rollup, and the week the
+        # window starts in from the attendance rows inside the window, as it only partly counts
+        weekly = {}
+        cursor.execute(f'''
+            SELECT student_id, week, records, present
+            FROM attendance_weekly
+            WHERE week > strftime('%Y-W%W', 'now', '-84 days') {attendance_filter}
+            UNION ALL
+            SELECT student_id, strftime('%Y-W%W', timestamp), COUNT(*), SUM(status = 'present')
+            FROM attendance
+            WHERE timestamp >= datetime('now', '-84 days')
+              AND strftime('%Y-W%W', timestamp) = strftime('%Y-W%W', 'now', '-84 days')
+              AND student_id IS NOT NULL {attendance_filter}
+            GROUP BY student_id
+            ORDER BY student_id, week DESC
+        ''', params * 2)
+        for sid, week, days, present in cursor.fetchall():
+            weekly.setdefault(sid, []).append((week, days, present))
+        
+        all_stats = []
+        for sid, name, present_days, total_days, late_arrivals, current_streak, last_present in totals:
+            attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
+            all_stats.append({
+                'student_name': name,
+                'present_days': present_days,
+                'total_days': total_days,
+                'attendance_percentage': round(attendance_percentage, 2),
+                'recent_attendance': recent.get(sid, []),
+                'monthly_data': monthly.get(sid, []),
+                'weekly_data': weekly.get(sid, []),
+                'current_streak': current_streak,
+                'late_arrivals': late_arrivals,
+                'last_present_date': last_present
+            })
+        return all_stats
     
     def get_student_stats(self, student_name: str) -> Dict:
         """Get comprehensive statistics for a student"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
@@ -107,167 +685,235 @@ class AttendanceDB:
             if not result:
                 return {}
             
-            student_id = result[0]
-            
-            # Get total attendance count
-            cursor.execute('''
-                SELECT COUNT(*) FROM attendance 
-                WHERE student_id = ? AND status = 'present'
-            ''', (student_id,))
-            present_days = cursor.fetchone()[0]
-            
-            # Get total days in database
-            cursor.execute('''
-                SELECT COUNT(DISTINCT DATE(timestamp)) FROM attendance 
-                WHERE student_id = ?
-            ''', (student_id,))
-            total_days = cursor.fetchone()[0]
-            
-            # Get attendance percentage
-            attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
-            
-            # Get recent attendance (last 30 days)
-            cursor.execute('''
-                SELECT DATE(timestamp), status FROM attendance 
-                WHERE student_id = ? AND timestamp >= datetime('now', '-30 days')
-                ORDER BY timestamp DESC
-            ''', (student_id,))
-            recent_attendance = cursor.fetchall()
-            
-            # Get monthly breakdown
-            cursor.execute('''
-                SELECT strftime('%Y-%m', timestamp) as month, 
-                       COUNT(*) as days,
-                       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present
-                FROM attendance 
-                WHERE student_id = ?
-                GROUP BY strftime('%Y-%m', timestamp)
-                ORDER BY month DESC
-            ''', (student_id,))
-            monthly_data = cursor.fetchall()
-            
-            # Get weekly data (last 12 weeks)
-            cursor.execute('''
-                SELECT strftime('%Y-W%W', timestamp) as week,
-                       COUNT(*) as days,
-                       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as present
-                FROM attendance 
-                WHERE student_id = ? AND timestamp >= datetime('now', '-84 days')
-                GROUP BY strftime('%Y-W%W', timestamp)
-                ORDER BY week DESC
-            ''', (student_id,))
-            weekly_data = cursor.fetchall()
-            
-            # Get attendance streak
-            cursor.execute('''
-                SELECT DATE(timestamp), status FROM attendance 
-                WHERE student_id = ?
-                ORDER BY timestamp DESC
-            ''', (student_id,))
-            all_attendance = cursor.fetchall()
-            
-            current_streak = 0
-            for record in all_attendance:
-                if record[1] == 'present':
-                    current_streak += 1
-                else:
-                    break
-            
-            # Get late arrivals (after 9 AM)
-            cursor.execute('''
-                SELECT COUNT(*) FROM attendance 
-                WHERE student_id = ? AND status = 'present' 
-                AND strftime('%H', timestamp) > '09'
-            ''', (student_id,))
-            late_arrivals = cursor.fetchone()[0]
-            
-            return {
-                'student_name': student_name,
-                'present_days': present_days,
-                'total_days': total_days,
-                'attendance_percentage': round(attendance_percentage, 2),
-                'recent_attendance': recent_attendance,
-                'monthly_data': monthly_data,
-                'weekly_data': weekly_data,
-                'current_streak': current_streak,
-                'late_arrivals': late_arrivals
-            }
+            stats = self._compute_stats(cursor, result[0])
+            return stats[0] if stats else {}
         except Exception as e:
             print(f"Error getting student stats: {e}")
             return {}
-        finally:
-            conn.close()
     
     def get_all_students_stats(self) -> List[Dict]:
         """Get statistics for all students"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT name FROM students")
-            students = cursor.fetchall()
-            
-            all_stats = []
-            for student in students:
-                stats = self.get_student_stats(student[0])
-                if stats:
-                    all_stats.append(stats)
-            
-            return all_stats
+            return self._compute_stats(cursor)
         except Exception as e:
             print(f"Error getting all students stats: {e}")
             return []
-        finally:
-            conn.close()
+    
+    def get_attendance_history_page(self, student_name: str = None, days: int = 30, limit: int = 500,
+                                    after: Tuple[str, int] = None) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """Get one page of attendance history, newest first, starting after the (timestamp, id) keyset cursor.
+        Returns the rows and the cursor for the next page, or None on the last page."""
+        cursor = self.get_connection().cursor()
+        conditions = ["a.timestamp >= datetime('now', ?)"]
+        params = [f"-{int(days)} days"]
+        if student_name:
+            conditions.append("s.name = ?")
+            params.append(student_name)
+        if after:
+            conditions.append("(a.timestamp, a.id) < (?, ?)")
+            params.extend(after)
+        params.append(limit)
+        
+        cursor.execute(f'''
+            SELECT a.id, s.name, a.timestamp, a.status, a.entry_type
+            FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY a.timestamp DESC, a.id DESC
+            LIMIT ?
+        ''', params)
+        rows = cursor.fetchall()
+        
+        history = [
+            {
+                'student_name': row[1],
+                'timestamp': row[2],
+                'status': row[3],
+                'entry_type': row[4]
+            }
+            for row in rows
+        ]
+        next_after = (rows[-1][2], rows[-1][0]) if len(rows) == limit else None
+        return history, next_after
+    
+    def iter_attendance_history(self, student_name: str = None, days: int = 30, batch_size: int = 500):
+        """Yield attendance history rows newest first, fetching one keyset page at a time"""
+        after = None
+        while True:
+            history, after = self.get_attendance_history_page(student_name, days, batch_size, after)
+            yield from history
+            if after is None:
+                return
     
     def get_attendance_history(self, student_name: str = None, days: int = 30) -> List[Dict]:
         """Get attendance history with optional filters"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            if student_name:
-                cursor.execute('''
-                    SELECT s.name, a.timestamp, a.status, a.entry_type
-                    FROM attendance a
-                    JOIN students s ON a.student_id = s.id
-                    WHERE s.name = ? AND a.timestamp >= datetime('now', '-{} days')
-                    ORDER BY a.timestamp DESC
-                '''.format(days), (student_name,))
-            else:
-                cursor.execute('''
-                    SELECT s.name, a.timestamp, a.status, a.entry_type
-                    FROM attendance a
-                    JOIN students s ON a.student_id = s.id
-                    WHERE a.timestamp >= datetime('now', '-{} days')
-                    ORDER BY a.timestamp DESC
-                '''.format(days))
-            
-            history = []
-            for row in cursor.fetchall():
-                history.append({
-                    'student_name': row[0],
-                    'timestamp': row[1],
-                    'status': row[2],
-                    'entry_type': row[3]
-                })
-            
-            return history
+            return list(self.iter_attendance_history(student_name, days))
         except Exception as e:
             print(f"Error getting attendance history: {e}")
             return []
-        finally:
-            conn.close()
     
-    def get_class_average_attendance(self) -> float:
+    def iter_attendance_export(self, after_id: int = 0, batch_size: int = 50000):
+        """Yield batches of (id, student_id, student_name, timestamp, day, status, entry_type) tuples
+        for attendance rows with id greater than after_id, in id order"""
+        cursor = self.get_connection().cursor()
+        while True:
+            cursor.execute('''
+                SELECT a.id, a.student_id, s.name, a.timestamp, a.day, a.status, a.entry_type
+                FROM attendance a
+                JOIN students s ON a.student_id = s.id
+                WHERE a.id > ?
+                ORDER BY a.id
+                LIMIT ?
+            ''', (after_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1][0]
+    
+    def iter_daily_rollup_export(self, batch_size: int = 50000):
+        """Yield batches of (student_id, student_name, day, records, present, late) tuples from the daily rollup"""
+        cursor = self.get_connection().cursor()
+        after = (-1, '')
+        while True:
+            cursor.execute('''
+                SELECT d.student_id, s.name, d.day, d.records, d.present, d.late
+                FROM attendance_daily d
+                JOIN students s ON d.student_id = s.id
+                WHERE (d.student_id, d.day) > (?, ?)
+                ORDER BY d.student_id, d.day
+                LIMIT ?
+            ''', (*after, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            yield rows
+            after = (rows[-1][0], rows[-1][2])
+    
+    def rebuild_rollups(self):
+        """Regenerate the daily, monthly and weekly rollup tables and the per-student counters from raw attendance rows"""
+        conn = self.get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in _rollup_rebuild_statements() + _counter_rebuild_statements():
+                conn.execute(statement)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def get_generation(self) -> int:
+        """Get the data generation counter, which changes whenever attendance or students change"""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT generation FROM data_generation WHERE id = 1")
+        result = cursor.fetchone()
+        return result[0] if result else 0
+    
+    def get_latest_change_id(self) -> int:
+        """Get the id of the newest attendance change log entry, or 0 if there are none"""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM attendance_changes")
+        return cursor.fetchone()[0]
+    
+    def get_changes_since(self, change_id: int, limit: int = 500) -> List[Dict]:
+        """Get attendance changes logged after change_id, oldest first"""
+        cursor = self.get_connection().cursor()
+        cursor.execute('''
+            SELECT c.id, c.change, s.name, c.timestamp, c.status, c.entry_type
+            FROM attendance_changes c
+            LEFT JOIN students s ON c.student_id = s.id
+            WHERE c.id > ?
+            ORDER BY c.id
+            LIMIT ?
+        ''', (change_id, limit))
+        return [
+            {
+                'id': row[0],
+                'change': row[1],
+                'student_name': row[2],
+                'timestamp': row[3],
+                'status': row[4],
+                'entry_type': row[5]
+            }
+            for row in cursor.fetchall()
+        ]
+    
+    def get_student_names(self) -> List[str]:
+        """Get the names of all students in alphabetical order"""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT name FROM students ORDER BY name")
+        return [row[0] for row in cursor.fetchall()]
+    
+    def get_today_attendance(self) -> Dict[str, Dict]:
+        """Get each student's latest attendance record for today, keyed by student name"""
+        cursor = self.get_connection().cursor()
+        today = date.today().strftime('%Y-%m-%d')
+        cursor.execute('''
+            SELECT s.name, a.status, MAX(a.timestamp)
+            FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE a.day = ?
+            GROUP BY a.student_id
+        ''', (today,))
+        return {name: {'status': status, 'timestamp': timestamp} for name, status, timestamp in cursor.fetchall()}
+    
+    def get_class_average_attendance(self, all_stats: List[Dict] = None) -> float:
         """Get average attendance percentage for all students"""
-        all_stats = self.get_all_students_stats()
+        if all_stats is None:
+            all_stats = self.get_all_students_stats()
         if not all_stats:
             return 0
         
         total_percentage = sum(stats['attendance_percentage'] for stats in all_stats)
         return round(total_percentage / len(all_stats), 2)
 
-# Initialize database instance
-db = AttendanceDB()
+class _LazyAttendanceDB:
+    """Stands in for the shared AttendanceDB and opens it on first use, so importing this module does no I/O"""
+    
+    def __init__(self, db_path: str = "attendance.db"):
+        self._db_path = db_path
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> AttendanceDB:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = AttendanceDB(self._db_path)
+        return self._instance
+    
+    def use(self, db_path: str) -> AttendanceDB:
+        """Point the shared instance at another database file, e.g. a benchmark's temporary one"""
+        with self._lock:
+            if self._instance is not None:
+                self._instance.close()
+            self._db_path = db_path
+            self._instance = AttendanceDB(db_path)
+        return self._instance
+    
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            # Introspection (pytest collection, copy, pickle) must not open the database
+            raise AttributeError(name)
+        return getattr(self._get(), name)
+
+# Initialize database instance (opened lazily on first use)
+db = _LazyAttendanceDB()
 
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Attendance database maintenance")
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help='regenerate the rollups and per-student counters from raw attendance rows')
+    args = parser.parse_args()
+    
+    if args.rebuild_rollups:
+        db.rebuild_rollups()
+        print("✅ Attendance rollups and counters rebuilt")
+    else:
+        parser.print_help()
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+from typing import Callable, Dict
+from models import PHOTO_EXTENSIONS
+
+class EmbeddingCache:
+    """On-disk cache of face embeddings keyed by absolute photo path. The paths, their file
+    stats and the embedding matrix live in one .npz file that is swapped in whole, so a reader
+    always sees rows and paths written together."""
+
+    def __init__(self, cache_dir: str = ".embedding_cache", model_name: str = "Facenet512", model_version: str = ''):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.model_version = model_version
+        self.cache_path = os.path.join(cache_dir, f"{model_name}.npz")
+
+    def _load(self):
+        """Return ({path: (size, mtime_ns, row)}, embedding matrix), or empty values if the cache is
+        missing, unreadable or written by another model version"""
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data['model_version']) != self.model_version:
+                    return {}, None
+                matrix = data['matrix']
+                paths, sizes, mtimes = data['paths'].tolist(), data['sizes'].tolist(), data['mtimes'].tolist()
+        except (OSError, ValueError, KeyError):
+            return {}, None
+        if not len(paths) == len(sizes) == len(mtimes) == len(matrix):
+            return {}, None
+        entries = {path: (size, mtime_ns, row) for row, (path, size, mtime_ns) in enumerate(zip(paths, sizes, mtimes))}
+        return entries, matrix
+
+    def _save(self, paths, sizes, mtimes, matrix: np.ndarray):
+        """Write the whole cache to a temporary file and swap it in with one rename"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, matrix=matrix, paths=np.array(paths, dtype=str),
+                     sizes=np.array(sizes, dtype=np.int64), mtimes=np.array(mtimes, dtype=np.int64),
+                     model_version=np.array(self.model_version))
+        os.replace(tmp_path, self.cache_path)
+
+    def sync(self, folder: str, embed: Callable[[str], list], extensions=PHOTO_EXTENSIONS) -> Dict[str, np.ndarray]:
+        """Return {filename: embedding} for every photo in folder, embedding only new or changed files.
+        Photos cached from other folders are kept."""
+        entries, matrix = self._load()
+        folder_path = os.path.abspath(folder)
+        paths, sizes, mtimes, rows = [], [], [], []
+        for path, (size, mtime_ns, row) in entries.items():
+            if os.path.dirname(path) != folder_path:
+                paths.append(path)
+                sizes.append(size)
+                mtimes.append(mtime_ns)
+                rows.append(matrix[row])
+        changed = False
+        synced = {}
+
+        for filename in sorted(os.listdir(folder)):
+            if not filename.lower().endswith(extensions):
+                continue
+            path = os.path.join(folder_path, filename)
+            stat = os.stat(path)
+            entry = entries.get(path)
+            if entry and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+                embedding = matrix[entry[2]]
+            else:
+                try:
+                    embedding = np.asarray(embed(path), dtype=np.float32)
+                except Exception as e:
+                    print(f"Error loading {filename}: {e}")
+                    continue
+                changed = True
+            synced[filename] = len(rows)
+            paths.append(path)
+            sizes.append(stat.st_size)
+            mtimes.append(stat.st_mtime_ns)
+            rows.append(embedding)
+
+        matrix = np.asarray(rows, dtype=np.float32) if rows else np.empty((0, 0), dtype=np.float32)
+        if changed or set(paths) != set(entries):
+            self._save(paths, sizes, mtimes, matrix)
+
+        return {filename: matrix[row] for filename, row in synced.items()}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Bulk Student Enrollment
+Embeds every photo in a folder with a pool of worker processes and stores the
+students together with their embeddings in the attendance database.
+
+Photos already enrolled with the same model and model version, size and
+modification time are skipped, so an interrupted run can simply be started again.
+With --prune, embeddings enrolled from this folder whose photo has since been
+deleted are removed; students enrolled from other folders are left alone.
+
+Usage: python enroll.py [known_faces] [--workers 4] [--commit-every 100] [--prune]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from database import db
+from models import PHOTO_EXTENSIONS, model_version
+
+_worker_model_name = None
+
+def _init_worker(model_name):
+    """Import DeepFace and build the model once per worker process"""
+    global _worker_model_name
+    from deepface import DeepFace
+    DeepFace.build_model(model_name)
+    _worker_model_name = model_name
+
+def embed_photo(path):
+    """Detect and embed the main face in one photo. Returns (path, embedding bytes, error)"""
+    import numpy as np
+    from deepface import DeepFace
+    try:
+        # One represent call runs detection, alignment and embedding together
+        faces = DeepFace.represent(img_path=path, model_name=_worker_model_name)
+    except Exception as e:
+        return path, None, str(e)
+    # If several faces were detected, enroll the largest one
+    face = max(faces, key=lambda f: f['facial_area']['w'] * f['facial_area']['h'])
+    return path, np.asarray(face['embedding'], dtype=np.float32).tobytes(), None
+
+def list_photos(folder):
+    return sorted(filename for filename in os.listdir(folder) if filename.lower().endswith(PHOTO_EXTENSIONS))
+
+def find_pending_photos(folder, model_name):
+    """Return photo paths that are new or changed, or embedded by another model version, since they were last enrolled"""
+    enrolled = db.get_enrolled_photos(model_name, model_version())
+    pending = []
+    for filename in list_photos(folder):
+        path = os.path.join(folder, filename)
+        stat = os.stat(path)
+        if enrolled.get(filename) != (stat.st_size, stat.st_mtime_ns):
+            pending.append(path)
+    return pending
+
+def enroll(folder="known_faces", model_name="Facenet512", workers=None, commit_every=100):
+    """Enroll every new or changed photo in folder. Returns (enrolled count, {filename: error})"""
+    pending = find_pending_photos(folder, model_name)
+    print(f"📦 {len(pending)} photos to enroll from {folder}")
+    if not pending:
+        return 0, {}
+
+    version = model_version()
+    enrolled = 0
+    failures = {}
+    batch = []
+
+    def flush():
+        nonlocal enrolled, batch
+        if batch:
+            enrolled += db.enroll_students(batch, model_name, version)
+            print(f"📝 Enrolled {enrolled}/{len(pending)}")
+            batch = []
+
+    # Spawned workers avoid forking a parent that may already hold TensorFlow state
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(model_name,)) as pool:
+        futures = [pool.submit(embed_photo, path) for path in pending]
+        for future in as_completed(futures):
+            path, embedding, error = future.result()
+            filename = os.path.basename(path)
+            if error:
+                failures[filename] = error
+                print(f"❌ {filename}: {error}")
+                continue
+            stat = os.stat(path)
+            batch.append({
+                'student_name': filename.split('.')[0],
+                'photo_filename': filename,
+                'photo_folder': os.path.abspath(folder),
+                'embedding': embedding,
+                'photo_size': stat.st_size,
+                'photo_mtime_ns': stat.st_mtime_ns
+            })
+            if len(batch) >= commit_every:
+                flush()
+        flush()
+
+    return enrolled, failures
+
+def prune(folder="known_faces", model_name="Facenet512"):
+    """Delete embeddings enrolled from folder whose photo is no longer there. Returns how many were deleted"""
+    photos = list_photos(folder)
+    if not photos:
+        # An empty or unmounted folder would otherwise wipe every student enrolled from it
+        print(f"⚠️ No photos in {folder}, not pruning")
+        return 0
+    return db.remove_missing_photos(model_name, os.path.abspath(folder), photos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder', nargs='?', default='known_faces', help='folder of StudentName.jpg photos')
+    parser.add_argument('--model', default='Facenet512', help='DeepFace model name')
+    parser.add_argument('--workers', type=int, default=None, help='embedding processes (default: CPU count)')
+    parser.add_argument('--commit-every', type=int, default=100,
+                        help='photos written per database transaction')
+    parser.add_argument('--prune', action='store_true',
+                        help='remove embeddings enrolled from this folder whose photo was deleted')
+    args = parser.parse_args()
+
+    enrolled, failures = enroll(args.folder, args.model, args.workers, args.commit_every)
+    print(f"✅ Enrolled {enrolled} students, {len(failures)} failures")
+    if args.prune:
+        print(f"🗑️ Removed {prune(args.folder, args.model)} embeddings whose photos are no longer in {args.folder}")
+    if failures:
+        for filename, error in sorted(failures.items()):
+            print(f"   - {filename}: {error}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Columnar Attendance Export
+Writes attendance rows joined with student names, and the daily rollup, as
+chunked columnar files for analytics tools:
+  - npz:     one compressed numpy archive per batch, strings stored as integer
+             codes plus a small lookup array, so it loads without pickle (default)
+  - parquet: one Parquet file per batch with dictionary-encoded strings (needs pyarrow)
+
+Rows are read from SQLite in keyset batches by attendance id, so memory stays
+bounded however large the table is. With --incremental only rows added since
+the last export (recorded in export_state.json) are written; edits to rows
+that were already exported are not picked up, so run a full export after
+corrections. The daily rollup is small and is rewritten in full every time.
+
+Usage: python export_attendance.py exports/ [--format npz|parquet] [--incremental] [--batch-size 100000]
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+import numpy as np
+from database import db
+
+STATE_FILE = "export_state.json"
+
+ATTENDANCE_COLUMNS = ('id', 'student_id', 'student_name', 'timestamp', 'day', 'status', 'entry_type')
+DAILY_COLUMNS = ('student_id', 'student_name', 'day', 'records', 'present', 'late')
+
+# Column name -> numpy dtype; anything not listed is a string column
+DTYPES = {
+    'id': np.int64,
+    'student_id': np.int64,
+    'timestamp': 'datetime64[s]',
+    'day': 'datetime64[D]',
+    'records': np.int32,
+    'present': np.int32,
+    'late': np.int32,
+}
+
+def to_columns(rows, names):
+    """Turn a batch of row tuples into {column: numpy array}, leaving string columns as lists"""
+    columns = {}
+    for name, values in zip(names, zip(*rows)):
+        columns[name] = np.array(values, dtype=DTYPES[name]) if name in DTYPES else list(values)
+    return columns
+
+def write_parquet(path, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    arrays = {
+        name: pa.array(values).dictionary_encode() if isinstance(values, list) else pa.array(values)
+        for name, values in columns.items()
+    }
+    pq.write_table(pa.table(arrays), path, compression='zstd')
+
+def write_npz(path, columns):
+    arrays = {}
+    for name, values in columns.items():
+        if isinstance(values, list):
+            # Dictionary-encode strings: a few distinct values repeated many times
+            categories, codes = np.unique(['' if value is None else value for value in values], return_inverse=True)
+            arrays[name] = codes.astype(np.int32)
+            arrays[f"{name}_categories"] = categories
+        else:
+            arrays[name] = values
+    with open(path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+
+WRITERS = {'parquet': write_parquet, 'npz': write_npz}
+
+def write_chunk(folder, filename, columns, fmt):
+    """Write one chunk via a temporary file so readers never pick up half a chunk"""
+    path = os.path.join(folder, f"{filename}.{fmt}")
+    tmp_path = path + ".tmp"
+    WRITERS[fmt](tmp_path, columns)
+    os.replace(tmp_path, path)
+    return path
+
+def load_state(output):
+    try:
+        with open(os.path.join(output, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(output, state):
+    tmp_path = os.path.join(output, STATE_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, os.path.join(output, STATE_FILE))
+
+def export_attendance(output, fmt='npz', after_id=0, batch_size=100000):
+    """Write attendance rows with id above after_id in chunks. Returns (rows written, last id)"""
+    folder = os.path.join(output, "attendance")
+    os.makedirs(folder, exist_ok=True)
+    written = 0
+    last_id = after_id
+    for rows in db.iter_attendance_export(after_id, batch_size):
+        first_id, last_id = rows[0][0], rows[-1][0]
+        write_chunk(folder, f"part-{first_id:012d}-{last_id:012d}", to_columns(rows, ATTENDANCE_COLUMNS), fmt)
+        written += len(rows)
+        # Saved after every chunk so an interrupted export resumes where it stopped
+        save_state(output, {'last_attendance_id': last_id, 'format': fmt,
+                            'exported_at': datetime.now().isoformat(timespec='seconds')})
+        print(f"📝 attendance rows {first_id}-{last_id} ({written} so far)")
+    return written, last_id
+
+def export_daily_rollup(output, fmt='npz', batch_size=100000):
+    """Rewrite the daily rollup snapshot in chunks. Returns the number of rows written"""
+    folder = os.path.join(output, "attendance_daily")
+    tmp_folder = folder + ".tmp"
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    os.makedirs(tmp_folder)
+    written = 0
+    for part, rows in enumerate(db.iter_daily_rollup_export(batch_size)):
+        write_chunk(tmp_folder, f"part-{part:05d}", to_columns(rows, DAILY_COLUMNS), fmt)
+        written += len(rows)
+    # Swap the finished snapshot in, so readers see either the old one or the new one
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(tmp_folder, folder)
+    print(f"📝 daily rollup: {written} rows")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', nargs='?', default='exports', help='folder for the exported files')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='npz', help='output format')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only export attendance rows added since the last export')
+    parser.add_argument('--batch-size', type=int, default=100000, help='rows per chunk')
+    args = parser.parse_args()
+
+    if args.format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("❌ Parquet export needs pyarrow (pip install pyarrow), or leave out --format parquet")
+            sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    after_id = 0
+    if args.incremental:
+        state = load_state(args.output)
+        if state and state.get('format') != args.format:
+            print(f"❌ {args.output} holds a {state.get('format')} export; use the same --format")
+            sys.exit(1)
+        after_id = state.get('last_attendance_id', 0)
+    else:
+        # A full export replaces every earlier chunk
+        for path in glob.glob(os.path.join(args.output, "attendance", "part-*")):
+            os.remove(path)
+
+    print(f"📦 Exporting attendance after id {after_id} to {args.output} as {args.format}")
+    written, last_id = export_attendance(args.output, args.format, after_id, args.batch_size)
+    if not written:
+        save_state(args.output, {'last_attendance_id': last_id, 'format': args.format,
+                                 'exported_at': datetime.now().isoformat(timespec='seconds')})
+    export_daily_rollup(args.output, args.format, args.batch_size)
+    print(f"✅ Exported {written} attendance rows (up to id {last_id})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import numpy as np
+
+def normalise(vectors):
+    """Scale rows to unit length so a dot product is the cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _results(names, distances, threshold):
+    """Turn best-match names and distances into (name, distance) pairs, dropping names over threshold"""
+    return [
+        (name, distance) if name is not None and distance < threshold else (None, distance)
+        for name, distance in zip(names, distances)
+    ]
+
+# ----------------- Exact Index -----------------
+class FaceGallery:
+    """Known face embeddings stored as one L2-normalised float32 matrix"""
+
+    def __init__(self, known_faces: dict = None):
+        self.names = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        if known_faces:
+            self.names = list(known_faces.keys())
+            self.matrix = normalise(list(known_faces.values()))
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a gallery from (name, float32 embedding bytes) rows such as AttendanceDB.get_embeddings"""
+        gallery = cls()
+        if rows:
+            gallery.names = [name for name, _ in rows]
+            vectors = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32)
+            gallery.matrix = normalise(vectors.reshape(len(rows), -1))
+        return gallery
+
+    def add(self, name, embedding):
+        """Add or replace one face"""
+        if name in self.names:
+            self.remove(name)
+        vector = normalise([embedding])
+        self.matrix = vector if not self.names else np.vstack([self.matrix, vector])
+        self.names.append(name)
+
+    def remove(self, name):
+        """Remove one face, e.g. when a student leaves"""
+        row = self.names.index(name)
+        del self.names[row]
+        self.matrix = np.delete(self.matrix, row, axis=0)
+
+    def match(self, embedding, threshold=0.3):
+        """Return (filename, distance) of the closest face under threshold, else (None, distance)"""
+        return self.match_batch([embedding], threshold)[0]
+
+    def match_batch(self, embeddings, threshold=0.3):
+        """Match several live embeddings with one matrix product, returning a (filename, distance) per row"""
+        if not self.names:
+            return [(None, None) for _ in embeddings]
+        if len(embeddings) == 0:
+            return []
+        distances = 1.0 - normalise(embeddings) @ self.matrix.T
+        best = np.argmin(distances, axis=1)
+        return _results(
+            [self.names[column] for column in best],
+            [float(distances[row, column]) for row, column in enumerate(best)],
+            threshold
+        )
+
+# ----------------- Approximate Index -----------------
+class IVFIndex:
+    """Inverted-file approximate index: faces are bucketed by their nearest k-means centroid
+    and a query only scans the n_probe buckets whose centroids are closest to it."""
+
+    def __init__(self, n_lists: int = None, n_probe: int = 16, iterations: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self._list_names = []
+        self._list_vectors = []
+        self._where = {}
+
+    def __len__(self):
+        return len(self._where)
+
+    @property
+    def names(self):
+        return [name for names in self._list_names for name in names]
+
+    @classmethod
+    def from_gallery(cls, gallery: FaceGallery, **kwargs):
+        index = cls(**kwargs)
+        index.build(gallery.names, gallery.matrix)
+        return index
+
+    def build(self, names, matrix):
+        """Train centroids on the given faces and bucket every face"""
+        vectors = normalise(matrix)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(names))))
+        n_lists = min(n_lists, len(names))
+        if n_lists == 0:
+            self.centroids = None
+            self._list_names, self._list_vectors, self._where = [], [], {}
+            return
+
+        self.centroids = self._train(vectors, n_lists)
+        assignment = np.argmax(vectors @ self.centroids.T, axis=1)
+        self._list_names = []
+        self._list_vectors = []
+        self._where = {}
+        for bucket in range(n_lists):
+            rows = np.flatnonzero(assignment == bucket)
+            self._list_names.append([names[row] for row in rows])
+            self._list_vectors.append(vectors[rows])
+            for row in rows:
+                self._where[names[row]] = bucket
+
+    def _train(self, vectors, n_lists):
+        """Spherical k-means on at most 256 samples per centroid"""
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(len(vectors), n_lists * 256)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(self.iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            order = np.argsort(assignment, kind='stable')
+            starts = np.cumsum(counts) - counts
+            filled = counts > 0
+            sums = centroids.copy()
+            sums[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+            centroids = normalise(sums)
+        return centroids
+
+    def add(self, name, embedding):
+        """Add or replace one face in the bucket of its nearest centroid"""
+        if name in self._where:
+            self.remove(name)
+        vector = normalise([embedding])
+        if self.centroids is None:
+            self.build([name], vector)
+            return
+        bucket = int(np.argmax(self.centroids @ vector[0]))
+        self._list_names[bucket].append(name)
+        self._list_vectors[bucket] = np.vstack([self._list_vectors[bucket], vector])
+        self._where[name] = bucket
+
+    def remove(self, name):
+        """Remove one face, e.g. when a student leaves"""
+        bucket = self._where.pop(name)
+        row = self._list_names[bucket].index(name)
+        del self._list_names[bucket][row]
+        self._list_vectors[bucket] = np.delete(self._list_vectors[bucket], row, axis=0)
+
+    def match(self, embedding, threshold=0.3):
+        """Return (filename, distance) of the closest face found under threshold, else (None, distance)"""
+        return self.match_batch([embedding], threshold)[0]
+
+    def match_batch(self, embeddings, threshold=0.3):
+        """Match several live embeddings, scanning only the closest buckets for each"""
+        if not self._where:
+            return [(None, None) for _ in embeddings]
+        if len(embeddings) == 0:
+            return []
+        queries = normalise(embeddings)
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        names, distances = [], []
+        for query, buckets in zip(queries, probes):
+            best_name, best_score = None, -np.inf
+            for bucket in buckets:
+                vectors = self._list_vectors[bucket]
+                if not len(vectors):
+                    continue
+                scores = vectors @ query
+                row = int(np.argmax(scores))
+                if scores[row] > best_score:
+                    best_name, best_score = self._list_names[bucket][row], float(scores[row])
+            names.append(best_name)
+            distances.append(1.0 - best_score if best_name is not None else None)
+        return _results(names, distances, threshold)
@@ -1,68 +1,429 @@
+import argparse
 import cv2
 import os
+import queue
+import sys
+import threading
 import time
 import numpy as np
-from deepface import DeepFace
+from attendance_writer import AttendanceWriter
+import metrics
 from database import db
+from embedding_cache import EmbeddingCache
+from face_index import FaceGallery, IVFIndex
+from models import model_version
 
-# ----------------- Cosine Distance Function -----------------
-def cosine_distance(a, b):
-    a = np.array(a)
-    b = np.array(b)
-    return 1 - (np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+# ----------------- Lazy DeepFace Import -----------------
+_deepface = None
+
+def get_deepface():
+    """Import DeepFace, and with it TensorFlow, on first use so importing this module stays cheap"""
+    global _deepface
+    if _deepface is None:
+        from deepface import DeepFace
+        _deepface = DeepFace
+    return _deepface
+
+def warm_up(model_name="Facenet512", detector_backend="opencv"):
+    """Build the model and detector and push a dummy frame through both, so the first real match is fast"""
+    DeepFace = get_deepface()
+    DeepFace.build_model(model_name)
+    dummy = np.zeros((160, 160, 3), dtype=np.uint8)
+    DeepFace.represent(img_path=dummy, model_name=model_name, detector_backend="skip")
+    try:
+        DeepFace.extract_faces(img_path=dummy, detector_backend=detector_backend)
+    except ValueError:
+        # No face in the dummy frame; the detector is built all the same
+        pass
 
 # ----------------- Load Known Faces -----------------
-def load_known_faces(folder="known_faces"):
-    face_db = {}
-    for filename in os.listdir(folder):
-        if filename.lower().endswith((".jpg", ".png", ".jpeg")):
-            path = os.path.join(folder, filename)
-            try:
-                embedding = DeepFace.represent(img_path=path, model_name="Facenet512")[0]['embedding']
-                face_db[filename] = embedding
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-    return face_db
+def load_known_faces(folder="known_faces", cache_dir=".embedding_cache"):
+    """Embed every photo in folder, reusing cached embeddings for unchanged files"""
+    cache = EmbeddingCache(cache_dir, model_name="Facenet512", model_version=model_version())
+    return cache.sync(
+        folder,
+        lambda path: get_deepface().represent(img_path=path, model_name="Facenet512")[0]['embedding']
+    )
+
+def sync_embeddings_to_db(folder="known_faces", model_name="Facenet512"):
+    """Store embeddings for photos in folder that are new, changed or embedded by another model version
+    since they were last saved to the DB. Embeddings of removed photos are kept; see enroll.py --prune"""
+    version = model_version()
+    stored = db.get_enrolled_photos(model_name, version)
+    records = []
+    for filename, embedding in load_known_faces(folder).items():
+        stat = os.stat(os.path.join(folder, filename))
+        if stored.get(filename) == (stat.st_size, stat.st_mtime_ns):
+            continue
+        records.append({
+            'student_name': filename.split('.')[0],
+            'photo_filename': filename,
+            'photo_folder': os.path.abspath(folder),
+            'embedding': np.asarray(embedding, dtype=np.float32).tobytes(),
+            'photo_size': stat.st_size,
+            'photo_mtime_ns': stat.st_mtime_ns
+        })
+    if records:
+        db.enroll_students(records, model_name, version)
+    return len(records)
+
+def load_gallery(folder="known_faces", model_name="Facenet512", index="exact"):
+    """Build the gallery from embeddings stored in the DB, first saving any new local photos.
+    Without a local photo folder the DB alone is enough, so no image decoding or inference is needed.
+    index="ivf" wraps the faces in an approximate IVFIndex for very large rosters."""
+    if os.path.isdir(folder):
+        updated = sync_embeddings_to_db(folder, model_name)
+        if updated:
+            print(f"📝 Stored {updated} new or changed embeddings in the database")
+    gallery = FaceGallery.from_rows(db.get_embeddings(model_name, model_version()))
+    if index == "ivf":
+        return IVFIndex.from_gallery(gallery)
+    return gallery
+
+# ----------------- Embed Frames -----------------
+def embed_frame(frame, model_name="Facenet512"):
+    """Embed a BGR numpy frame in memory, without a temporary image file"""
+    with metrics.INFERENCE_SECONDS.time(call='represent'):
+        return get_deepface().represent(img_path=frame, model_name=model_name)[0]['embedding']
+
+def detect_faces(frame, detector_backend="opencv"):
+    """Return the facial_area box, plus detector confidence, of every face in the frame without running the embedding model"""
+    try:
+        with metrics.INFERENCE_SECONDS.time(call='extract_faces'):
+            faces = get_deepface().extract_faces(img_path=frame, detector_backend=detector_backend)
+    except ValueError:
+        return []
+    return [dict(face['facial_area'], confidence=face.get('confidence', 1.0)) for face in faces]
+
+def embed_crop(frame, area, model_name="Facenet512"):
+    """Embed an already-detected face, slicing it out of the frame as a view"""
+    x, y, w, h = area['x'], area['y'], area['w'], area['h']
+    crop = frame[max(y, 0):y + h, max(x, 0):x + w]
+    with metrics.INFERENCE_SECONDS.time(call='represent_crop'):
+        return get_deepface().represent(img_path=crop, model_name=model_name, detector_backend="skip")[0]['embedding']
+
+# ----------------- Quality Gate -----------------
+class QualityGate:
+    """Cheap brightness, blur and detector-confidence checks that keep hopeless frames and faces
+    away from the embedding model. Only rejections that stopped an embedding call count as inference saved."""
+
+    def __init__(self, min_brightness=40, max_brightness=220, min_sharpness=50.0,
+                 min_face_confidence=0.8, frame_width=320, face_size=112):
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.min_sharpness = min_sharpness
+        self.min_face_confidence = min_face_confidence
+        self.frame_width = frame_width
+        self.face_size = face_size
+        self.checked = 0
+        self.passed = 0
+        self.rejected = {}
+        self.inference_saved = 0
+        self._lock = threading.Lock()
+
+    def _record(self, reason, embeds):
+        with self._lock:
+            self.checked += 1
+            if reason:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+                if embeds:
+                    self.inference_saved += 1
+            else:
+                self.passed += 1
+        return reason
+
+    def _image_problem(self, image, width):
+        """Return 'dark', 'bright' or 'blurry' for a BGR image checked at the given width, else None"""
+        if image.size == 0:
+            return 'empty'
+        height = max(1, round(image.shape[0] * width / image.shape[1]))
+        small = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        brightness = gray.mean()
+        if brightness < self.min_brightness:
+            return 'dark'
+        if brightness > self.max_brightness:
+            return 'bright'
+        if cv2.Laplacian(gray, cv2.CV_64F).var() < self.min_sharpness:
+            return 'blurry'
+        return None
+
+    def check_frame(self, frame, embeds=True):
+        """Return None if the whole frame is worth running through the model, else the reason it is not.
+        Pass embeds=False when a passing frame only goes on to face detection, as in the tracking
+        pipelines, so a rejection there is not counted as an embedding call saved."""
+        return self._record(self._image_problem(frame, self.frame_width), embeds)
+
+    def check_face(self, frame, area):
+        """Return None if a detected face is worth embedding, else the reason it is not.
+        Only call it for faces that would otherwise be embedded."""
+        if area.get('confidence', 1.0) < self.min_face_confidence:
+            return self._record('low_confidence', True)
+        x, y, w, h = area['x'], area['y'], area['w'], area['h']
+        crop = frame[max(y, 0):y + h, max(x, 0):x + w]
+        return self._record(self._image_problem(crop, self.face_size), True)
+
+    def summary(self):
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(self.rejected.items()))
+        rejected = self.checked - self.passed
+        return (f"{self.inference_saved} embedding calls saved by the quality gate, "
+                f"{rejected} of {self.checked} checks rejected") + (f" ({reasons})" if reasons else "")
 
 # ----------------- Match Faces -----------------
-def match_face(frame, known_faces, threshold=0.3):
-    cv2.imwrite("temp.jpg", frame)
+@metrics.timed(metrics.MATCH_SECONDS, caller='match_face')
+def match_face(frame, known_faces, threshold=0.3, gate: QualityGate = None, writer: AttendanceWriter = None):
+    if isinstance(known_faces, dict):
+        known_faces = FaceGallery(known_faces)
+    if gate:
+        reason = gate.check_frame(frame)
+        if reason:
+            return f"⏭️ Skipped {reason} frame"
     try:
-        live_embedding = DeepFace.represent(img_path="temp.jpg", model_name="Facenet512")[0]['embedding']
-        for name, stored_embedding in known_faces.items():
-            distance = cosine_distance(live_embedding, stored_embedding)
-            if distance < threshold:
-                # Extract student name from filename (remove .jpg extension)
-                student_name = name.split('.')[0]
-                
-                # Log attendance to database
-                success = db.log_attendance(student_name, 'present', 'automatic')
-                if success:
-                    return f"✅ Match Found: {student_name} - Attendance Logged!"
-                else:
-                    return f"✅ Match Found: {student_name} - Already logged today"
+        live_embedding = embed_frame(frame)
+        name, _ = known_faces.match(live_embedding, threshold)
+        if name:
+            # Extract student name from filename (remove .jpg extension)
+            student_name = name.split('.')[0]
+            
+            # Hand off to the write-behind logger if there is one, so a busy DB cannot stall the camera
+            if writer:
+                writer.log(student_name)
+                return f"✅ Match Found: {student_name} - Attendance queued"
+            
+            # Log attendance to database
+            success = db.log_attendance(student_name, 'present', 'automatic')
+            if success:
+                return f"✅ Match Found: {student_name} - Attendance Logged!"
+            else:
+                return f"✅ Match Found: {student_name} - Already logged today"
         return "Face recognized"
     except Exception as e:
         return f"⚠️ Error: {e}"
 
-# ----------------- Main -----------------
-def main():
-    print("📦 Loading known faces...")
-    known_faces = load_known_faces()
-    print(f"✅ Loaded {len(known_faces)} known faces")
-    
-    # Initialize students in database
-    print("📝 Initializing students in database...")
-    for filename in known_faces.keys():
-        student_name = filename.split('.')[0]
-        db.add_student(student_name, filename)
-    print("✅ Students initialized in database")
+# ----------------- Face Tracking -----------------
+def box_iou(a, b):
+    """Intersection over union of two facial_area boxes"""
+    ax2, ay2 = a['x'] + a['w'], a['y'] + a['h']
+    bx2, by2 = b['x'] + b['w'], b['y'] + b['h']
+    iw = max(0, min(ax2, bx2) - max(a['x'], b['x']))
+    ih = max(0, min(ay2, by2) - max(a['y'], b['y']))
+    intersection = iw * ih
+    union = a['w'] * a['h'] + b['w'] * b['h'] - intersection
+    return intersection / union if union > 0 else 0.0
+
+class Track:
+    """A face followed across frames together with its current identity"""
+
+    def __init__(self, track_id, area):
+        self.track_id = track_id
+        self.area = area
+        self.student_name = None
+        self.distance = None
+        self.confidence = 0.0
+        self.missed = 0
+        self.logged = False
+        self.pending = False
+
+class FaceTracker:
+    """Greedy IoU tracker that only asks for an embedding when a track is new or its confidence has decayed"""
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, confidence_decay=0.97, min_confidence=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.confidence_decay = confidence_decay
+        self.min_confidence = min_confidence
+        self.tracks = []
+        self._next_id = 1
+        self.embeddings_run = 0
+        self.embeddings_skipped = 0
+
+    def update(self, areas):
+        """Associate this frame's detections with existing tracks and return the track for each area"""
+        pairs = sorted(
+            ((box_iou(track.area, area), t, a) for t, track in enumerate(self.tracks) for a, area in enumerate(areas)),
+            key=lambda pair: pair[0],
+            reverse=True
+        )
+        assigned = [None] * len(areas)
+        used_tracks = set()
+        for iou, t, a in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in used_tracks or assigned[a] is not None:
+                continue
+            used_tracks.add(t)
+            assigned[a] = self.tracks[t]
+
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for a, area in enumerate(areas):
+            track = assigned[a]
+            if track is None:
+                track = Track(self._next_id, area)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[a] = track
+            else:
+                track.area = area
+                track.missed = 0
+                track.confidence *= self.confidence_decay
+
+        # Embeddings are counted as run in identify, once they have actually been run
+        self.embeddings_skipped += sum(1 for track in assigned if not self.needs_embedding(track))
+        return assigned
+
+    def needs_embedding(self, track):
+        return track.confidence < self.min_confidence
+
+    def identify(self, track, student_name, distance):
+        """Record a fresh embedding result; a new identity resets the track's logged flag"""
+        self.embeddings_run += 1
+        if student_name != track.student_name:
+            track.logged = False
+        track.student_name = student_name
+        track.distance = distance
+        track.confidence = 1.0
+
+# ----------------- Background Recognition -----------------
+class LatestFrameQueue:
+    """Single-slot frame queue: putting a new frame discards any frame not yet picked up"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=1)
+        self.dropped = 0
 
+    def put(self, frame):
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(frame)
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+class RecognitionWorker(threading.Thread):
+    """Runs detection, embedding and matching off the capture thread and logs attendance"""
+
+    def __init__(self, gallery, frames: LatestFrameQueue, threshold=0.3, tracker: FaceTracker = None,
+                 gate: QualityGate = None, writer: AttendanceWriter = None):
+        super().__init__(daemon=True)
+        self.gallery = gallery
+        self.frames = frames
+        self.threshold = threshold
+        self.tracker = tracker or FaceTracker()
+        self.gate = gate or QualityGate()
+        self.writer = writer
+        self.stop_event = threading.Event()
+        self.latest_results = []
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                frame = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.latest_results = self.process(frame)
+            except Exception as e:
+                print(f"⚠️ Error: {e}")
+
+    def process(self, frame):
+        """Track faces in the frame, embed only the tracks that need it, and log new identities"""
+        if self.gate.check_frame(frame, embeds=False):
+            # Too dark, bright or blurry to be worth detecting in; keep showing the last results
+            return self.latest_results
+        tracks = self.tracker.update(detect_faces(frame))
+        pending = [
+            track for track in tracks
+            if self.tracker.needs_embedding(track) and not self.gate.check_face(frame, track.area)
+        ]
+        if pending:
+            embeddings = [embed_crop(frame, track.area) for track in pending]
+            with metrics.MATCH_SECONDS.time(caller='recognition_worker'):
+                matches = self.gallery.match_batch(embeddings, self.threshold)
+            for track, (name, distance) in zip(pending, matches):
+                self.tracker.identify(track, name.split('.')[0] if name else None, distance)
+
+        for track in tracks:
+            if track.student_name and not track.logged:
+                track.logged = True
+                self._log(track.student_name)
+
+        return [
+            {'student_name': track.student_name, 'distance': track.distance, 'facial_area': track.area}
+            for track in tracks
+        ]
+
+    def _log(self, student_name):
+        if self.writer:
+            self.writer.log(student_name)
+            print(f"✅ Match Found: {student_name} - Attendance queued")
+        elif db.log_attendance(student_name, 'present', 'automatic'):
+            print(f"✅ Match Found: {student_name} - Attendance Logged!")
+        else:
+            print(f"✅ Match Found: {student_name} - Already logged today")
+
+def draw_results(frame, results):
+    """Overlay face boxes and names from the most recent recognition pass"""
+    for result in results:
+        area = result['facial_area']
+        if not area:
+            continue
+        x, y, w, h = area.get('x', 0), area.get('y', 0), area.get('w', 0), area.get('h', 0)
+        color = (0, 200, 0) if result['student_name'] else (0, 0, 255)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(frame, result['student_name'] or "Unknown", (x, max(y - 8, 0)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+def run_continuous(gallery, source=0, writer: AttendanceWriter = None):
+    """Capture and display at camera rate while a worker thread recognises every face"""
+    cap = cv2.VideoCapture(source)
+    frames = LatestFrameQueue()
+    worker = RecognitionWorker(gallery, frames, writer=writer)
+    worker.start()
+    print("📷 Webcam started. Continuous recognition running. Press 'Q' to quit.")
+
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frames.put(frame)
+            cv2.imshow("Face Recognition", draw_results(frame.copy(), worker.latest_results))
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        worker.stop()
+        worker.join()
+        cap.release()
+        cv2.destroyAllWindows()
+        print(f"🛑 Stopped. {frames.dropped} stale frames skipped, "
+              f"{worker.tracker.embeddings_skipped} embeddings saved by tracking, "
+              f"{worker.gate.summary()}.")
+
+def run_single_check(gallery, writer: AttendanceWriter = None):
+    """Original mode: check one frame after the interval and exit"""
     cap = cv2.VideoCapture(0)
     print("📷 Webcam started. Auto-check every 3 seconds. Press 'Q' to quit.")
 
-    last_check_time = 0
-    check_interval = 3  # seconds
+    next_check_time = 0
+    retry_interval = 0.5  # seconds between checks while frames are rejected
+    last_rejection = None
+    gate = QualityGate()
 
     while True:
         ret, frame = cap.read()
@@ -72,12 +433,18 @@ def main():
         cv2.imshow("Face Recognition", frame)
 
         # Auto recognition
-        if time.time() - last_check_time > check_interval:
-            last_check_time = time.time()
-            print("🔍 Matching face...")
-            result = match_face(frame, known_faces)
-            print(result)
-            break
+        if time.time() >= next_check_time:
+            reason = gate.check_frame(frame)
+            if reason:
+                # Poor frame: retry shortly instead of waiting another interval, reporting each new reason once
+                if reason != last_rejection:
+                    print(f"⏭️ Skipped {reason} frame, retrying")
+                    last_rejection = reason
+                next_check_time = time.time() + retry_interval
+            else:
+                print("🔍 Matching face...")
+                print(match_face(frame, gallery, writer=writer))
+                break
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
@@ -85,5 +452,45 @@ def main():
     cap.release()
     cv2.destroyAllWindows()
 
+# ----------------- Main -----------------
+def main():
+    parser = argparse.ArgumentParser(description="Face recognition attendance")
+    parser.add_argument('--continuous', action='store_true',
+                        help='keep recognising every face in view instead of stopping after one check')
+    parser.add_argument('--index', choices=['exact', 'ivf'], default='exact',
+                        help='face matcher: exact search, or approximate IVF for very large rosters')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve Prometheus metrics for this process on this port')
+    parser.add_argument('--spool', default='attendance_spool.main.jsonl',
+                        help='file holding recognitions not yet committed; every running recognizer needs its own')
+    args = parser.parse_args()
+
+    # Claim the spool first so a second recognizer sharing it stops before loading the model
+    try:
+        writer = AttendanceWriter(spool_path=args.spool)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    print("📦 Loading known faces...")
+    gallery = load_gallery(index=args.index)
+    print(f"✅ Loaded {len(gallery)} known faces")
+
+    print("🔥 Warming up model...")
+    warm_up()
+
+    writer.start()
+    try:
+        if args.continuous:
+            run_continuous(gallery, writer=writer)
+        else:
+            run_single_check(gallery, writer=writer)
+    finally:
+        writer.close()
+        print(f"💾 Attendance writer: {writer.summary()}")
+
 if __name__ == "__main__":
     main()
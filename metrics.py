@@ -0,0 +1,223 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from sub-millisecond SQL to multi-second model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# SQL statements slower than this many milliseconds are printed; unset or 0 disables the log
+SLOW_QUERY_MS = float(os.environ.get('ATTENDANCE_SLOW_QUERY_MS') or 0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base for a named metric family with a fixed set of label names"""
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds spent inside the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_value(self, key, entry):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, entry['counts']):
+            cumulative += count
+            labels = _format_labels(self.label_names, key, [('le', repr(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', '+Inf')])} {entry['count']}")
+        lines.append(f"{self.name}_sum{labels} {entry['sum']!r}")
+        lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+class CallbackGauge(Metric):
+    """A value read from a callback when metrics are rendered, e.g. a cache's hit count"""
+
+    def __init__(self, name, help_text, callback, kind='gauge'):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}",
+                f"{self.name} {_format_number(self.callback())}"]
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric, or return the one already registered under its name"""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+INFERENCE_SECONDS = REGISTRY.register(Histogram(
+    'attendance_inference_seconds', 'DeepFace call latency', ['call']))
+MATCH_SECONDS = REGISTRY.register(Histogram(
+    'attendance_match_seconds', 'Face matching latency, embedding included for match_face', ['caller']))
+DB_METHOD_SECONDS = REGISTRY.register(Histogram(
+    'attendance_db_method_seconds', 'AttendanceDB method latency', ['method']))
+SQL_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'attendance_sql_query_seconds', 'SQLite statement execution latency', ['statement']))
+SLOW_QUERIES = REGISTRY.register(Counter(
+    'attendance_sql_slow_queries_total', 'SQLite statements slower than the slow query threshold'))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'attendance_http_request_seconds', 'Flask request latency until the response is returned',
+    ['endpoint', 'method', 'status']))
+HTTP_REQUEST_QUERIES = REGISTRY.register(Histogram(
+    'attendance_http_request_queries', 'SQLite statements run per request', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500)))
+WRITER_FLUSH_SECONDS = REGISTRY.register(Histogram(
+    'attendance_writer_flush_seconds', 'Write-behind batch commit latency, lock retries included'))
+WRITER_RETRIES = REGISTRY.register(Counter(
+    'attendance_writer_retries_total', 'Write-behind batch commits retried because the database was locked'))
+WRITER_RECORDS = REGISTRY.register(Counter(
+    'attendance_writer_records_total', 'Recognitions handled by the write-behind writer', ['result']))
+
+# ----------------- Per-Request Query Counting -----------------
+_local = threading.local()
+
+def start_query_count():
+    _local.queries = 0
+
+def query_count():
+    return getattr(_local, 'queries', 0)
+
+def record_query(sql, seconds):
+    """Time one SQL statement, count it for the current request and log it if it was slow"""
+    _local.queries = getattr(_local, 'queries', 0) + 1
+    statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ''
+    SQL_QUERY_SECONDS.observe(seconds, statement=statement)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        print(f"🐢 Slow query ({seconds * 1000:.1f} ms): {' '.join(sql.split())[:500]}")
+
+# ----------------- Decorators -----------------
+def timed(histogram, **labels):
+    """Decorator observing a function's latency; generators are timed until exhausted"""
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    yield from func(*args, **kwargs)
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrument_methods(histogram, label='method', exclude=()):
+    """Class decorator timing every public method into histogram, labelled by method name"""
+    def decorator(cls):
+        for name, member in list(vars(cls).items()):
+            if not name.startswith('_') and name not in exclude and inspect.isfunction(member):
+                setattr(cls, name, timed(histogram, **{label: name})(member))
+        return cls
+    return decorator
+
+# ----------------- Standalone Exporter -----------------
+def start_http_server(port, host='0.0.0.0'):
+    """Serve /metrics from a background thread, for processes without the Flask app such as the recognizers"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics server").start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return server
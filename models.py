@@ -0,0 +1,12 @@
+"""Face model details shared by enrollment, the recognizers and the embedding cache"""
+
+# Files in a photo folder that are enrolled as student photos
+PHOTO_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+def model_version():
+    """Tag stored with every embedding, so photos are embedded again after a DeepFace upgrade"""
+    try:
+        from importlib.metadata import version
+        return f"deepface-{version('deepface')}"
+    except Exception:
+        return ''
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Multi-Camera Recognizer Service
+Reads several capture sources at once (device indexes, RTSP URLs or video
+files) and recognises faces from all of them with one shared model.
+
+Each source runs on its own thread, detecting and tracking faces locally.
+Crops of new or uncertain tracks go to a single inference worker that embeds
+them with the one Facenet512 model in this process and matches each batch,
+gathered across cameras, against the gallery in one call.
+
+Usage: python recognizer_service.py 0 1 rtsp://door-cam/stream lecture.mp4 [--index ivf]
+"""
+
+import argparse
+import queue
+import sys
+import threading
+import time
+import cv2
+from attendance_writer import AttendanceWriter
+import metrics
+from database import db
+from main import FaceTracker, QualityGate, detect_faces, embed_crop, load_gallery, warm_up
+
+class InferenceWorker(threading.Thread):
+    """Single embedding worker shared by every camera; drains queued crops in batches"""
+
+    def __init__(self, gallery, threshold=0.3, batch_size=16, queue_size=256, writer: AttendanceWriter = None):
+        super().__init__(daemon=True)
+        self.gallery = gallery
+        self.writer = writer
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.embedded = 0
+        self.dropped = 0
+
+    def submit(self, camera, track, frame, area):
+        """Queue a track's face for embedding; if the queue is full the track is retried on a later frame"""
+        try:
+            self.jobs.put_nowait((camera, track, frame, area))
+        except queue.Full:
+            self.dropped += 1
+            track.pending = False
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _next_batch(self):
+        batch = [self.jobs.get(timeout=0.5)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                continue
+
+            embedded = []
+            for camera, track, frame, area in batch:
+                try:
+                    embedded.append((camera, track, embed_crop(frame, area)))
+                except Exception as e:
+                    print(f"⚠️ [{camera.name}] Error: {e}")
+                    with camera.lock:
+                        track.pending = False
+            if not embedded:
+                continue
+            self.embedded += len(embedded)
+
+            with metrics.MATCH_SECONDS.time(caller='inference_worker'):
+                matches = self.gallery.match_batch([embedding for _, _, embedding in embedded], self.threshold)
+            for (camera, track, _), (name, distance) in zip(embedded, matches):
+                with camera.lock:
+                    camera.tracker.identify(track, name.split('.')[0] if name else None, distance)
+                    track.pending = False
+                    should_log = track.student_name and not track.logged
+                    if should_log:
+                        track.logged = True
+                if should_log:
+                    self._log(camera, track.student_name)
+
+    def _log(self, camera, student_name):
+        if self.writer:
+            self.writer.log(student_name)
+            print(f"✅ [{camera.name}] Match Found: {student_name} - Attendance queued")
+        elif db.log_attendance(student_name, 'present', 'automatic'):
+            print(f"✅ [{camera.name}] Match Found: {student_name} - Attendance Logged!")
+        else:
+            print(f"✅ [{camera.name}] Match Found: {student_name} - Already logged today")
+
+class CameraThread(threading.Thread):
+    """Captures one source, tracks faces and hands new or uncertain tracks to the inference worker"""
+
+    def __init__(self, source, inference: InferenceWorker, gate: QualityGate, reconnect_delay=5.0):
+        super().__init__(daemon=True)
+        self.source = source
+        self.name = f"camera {source}"
+        self.inference = inference
+        self.gate = gate
+        self.reconnect_delay = reconnect_delay
+        self.tracker = FaceTracker()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.frames = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        is_file = isinstance(self.source, str) and not self.source.startswith(("rtsp://", "http://", "https://"))
+        while not self.stop_event.is_set():
+            cap = cv2.VideoCapture(self.source)
+            while not self.stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.frames += 1
+                self._process(frame)
+            cap.release()
+
+            if is_file:
+                print(f"📼 [{self.name}] End of video")
+                return
+            if not self.stop_event.is_set():
+                print(f"⚠️ [{self.name}] Stream lost, reconnecting in {self.reconnect_delay:.0f}s")
+                self.stop_event.wait(self.reconnect_delay)
+
+    def _process(self, frame):
+        if self.gate.check_frame(frame, embeds=False):
+            return
+        areas = detect_faces(frame)
+        with self.lock:
+            tracks = self.tracker.update(areas)
+            pending = [
+                track for track in tracks
+                if self.tracker.needs_embedding(track) and not track.pending
+                and not self.gate.check_face(frame, track.area)
+            ]
+            for track in pending:
+                track.pending = True
+        for track in pending:
+            self.inference.submit(self, track, frame, track.area)
+
+def parse_source(source):
+    """Device indexes are given as numbers; anything else is a URL or file path"""
+    return int(source) if source.isdigit() else source
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='+', help='device indexes, RTSP/HTTP URLs or video files')
+    parser.add_argument('--index', choices=['exact', 'ivf'], default='exact', help='face matcher')
+    parser.add_argument('--batch-size', type=int, default=16, help='face crops embedded per inference batch')
+    parser.add_argument('--metrics-port', type=int, default=None, help='serve Prometheus metrics on this port')
+    parser.add_argument('--spool', default='attendance_spool.service.jsonl',
+                        help='file holding recognitions not yet committed; every running recognizer needs its own')
+    args = parser.parse_args()
+
+    # Claim the spool first so a second recognizer sharing it stops before loading the model
+    try:
+        writer = AttendanceWriter(spool_path=args.spool)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    print("📦 Loading known faces...")
+    gallery = load_gallery(index=args.index)
+    print(f"✅ Loaded {len(gallery)} known faces")
+
+    print("🔥 Warming up model...")
+    warm_up()
+
+    inference = InferenceWorker(gallery, batch_size=args.batch_size, writer=writer)
+    gate = QualityGate()
+    cameras = [CameraThread(parse_source(source), inference, gate) for source in args.sources]
+    writer.start()
+    inference.start()
+    for camera in cameras:
+        camera.start()
+    print(f"📷 Recognising on {len(cameras)} sources. Press Ctrl+C to stop.")
+
+    try:
+        while any(camera.is_alive() for camera in cameras):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for camera in cameras:
+            camera.stop()
+        for camera in cameras:
+            camera.join()
+        inference.stop()
+        inference.join()
+        writer.close()
+        skipped = sum(camera.tracker.embeddings_skipped for camera in cameras)
+        print(f"🛑 Stopped. {inference.embedded} faces embedded, {skipped} embeddings saved by tracking, "
+              f"{inference.dropped} crops dropped while the worker was busy, {gate.summary()}.")
+        print(f"💾 Attendance writer: {writer.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,13 @@ This script adds some sample attendance records with different times
 """
 
 from database import db
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
 
 def add_sample_attendance():
     """Add sample attendance records with different times"""
     
     # Get all students
-    conn = db.db_path
-    import sqlite3
-    conn = sqlite3.connect(conn)
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM students")
-    students = [row[0] for row in cursor.fetchall()]
-    conn.close()
+    students = db.get_student_names()
     
     if not students:
         print("No students found. Please run main.py first to initialize students.")
@@ -42,15 +35,13 @@ def add_sample_attendance():
     
     for i, student in enumerate(students):
         # Clear existing attendance for today first
-        conn = sqlite3.connect(db.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            DELETE FROM attendance 
-            WHERE student_id = (SELECT id FROM students WHERE name = ?) 
-            AND DATE(timestamp) = ?
-        """, (student, today))
-        conn.commit()
-        conn.close()
+        conn = db.get_connection()
+        with conn:
+            conn.execute("""
+                DELETE FROM attendance 
+                WHERE student_id = (SELECT id FROM students WHERE name = ?) 
+                AND DATE(timestamp) = ?
+            """, (student, today))
         
         # Add new attendance record
         time_str = sample_times[i % len(sample_times)]
@@ -61,18 +52,18 @@ def add_sample_attendance():
         
         if success:
             # Update the timestamp to our sample time
-            conn = sqlite3.connect(db.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE attendance 
-                SET timestamp = ? 
-                WHERE student_id = (SELECT id FROM students WHERE name = ?) 
-                AND DATE(timestamp) = ?
-                ORDER BY timestamp DESC 
-                LIMIT 1
-            """, (timestamp, student, today))
-            conn.commit()
-            conn.close()
+            with conn:
+                conn.execute("""
+                    UPDATE attendance 
+                    SET timestamp = ? 
+                    WHERE id = (
+                        SELECT id FROM attendance
+                        WHERE student_id = (SELECT id FROM students WHERE name = ?) 
+                        AND DATE(timestamp) = ?
+                        ORDER BY timestamp DESC 
+                        LIMIT 1
+                    )
+                """, (timestamp, student, today))
             
             print(f"✅ {student}: {time_str} AM/PM")
         else:
@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import db  # noqa: E402
+
+@pytest.fixture
+def database(tmp_path):
+    """The shared db pointed at an empty database in a temporary folder"""
+    instance = db.use(str(tmp_path / "attendance.db"))
+    yield instance
+    instance.close()
+
+@pytest.fixture
+def client(database):
+    """Flask test client for the dashboard, backed by the temporary database"""
+    from app import app, response_cache
+    response_cache.clear()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    response_cache.clear()
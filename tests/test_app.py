@@ -0,0 +1,60 @@
+import pytest
+
+@pytest.mark.parametrize('payload', [
+    {'students': 'Anshika'},
+    {'students': []},
+    {'students': {'student_name': 'Anshika'}},
+    {'students': ['Anshika', '']},
+    {'students': ['Anshika', 7]},
+    {'students': [{'status': 'present'}]},
+    {'students': ['Anshika'], 'status': 'on holiday'},
+    {'students': [{'student_name': 'Anshika', 'status': None}]},
+    ['Anshika'],
+])
+def test_bulk_entry_rejects_malformed_students(client, database, payload):
+    response = client.post('/api/attendance/manual/bulk', json=payload)
+    assert response.status_code == 400
+    assert database.get_student_names() == []
+
+def test_bulk_entry_logs_names_and_objects(client, database):
+    response = client.post('/api/attendance/manual/bulk', json={
+        'status': 'present',
+        'students': ['Anshika', {'student_name': 'Harini', 'status': 'late'}, 'Anshika'],
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['logged'] == 2
+    assert [r['result'] for r in body['results']] == ['logged', 'logged', 'already_logged']
+    assert body['results'][1]['status'] == 'late'
+
+def log_days(database, name, count):
+    conn = database.get_connection()
+    student_id = database.add_student(name)
+    with conn:
+        conn.executemany("INSERT INTO attendance (student_id, timestamp) VALUES (?, datetime('now', ?))",
+                         [(student_id, f'-{day} days') for day in range(count)])
+
+def test_history_pages_cover_every_row_once(client, database):
+    log_days(database, "Anshika", 7)
+    seen, cursor = [], None
+    while True:
+        url = '/api/attendance/history?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        assert len(body['history']) <= 3
+        seen += body['history']
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 7
+    assert len({row['timestamp'] for row in seen}) == 7
+
+@pytest.mark.parametrize('limit, expected', [(-5, 1), (1, 1), (5000, 12)])
+def test_history_limit_is_clamped(client, database, limit, expected):
+    log_days(database, "Anshika", 12)
+    body = client.get(f'/api/attendance/history?limit={limit}').get_json()
+    assert len(body['history']) == expected
+
+@pytest.mark.parametrize('query', ['days=abc', 'limit=10&cursor=abc', 'limit=10&cursor=WzFd',
+                                   'limit=10&cursor=eyJhIjogMX0='])
+def test_history_rejects_malformed_arguments(client, database, query):
+    assert client.get(f'/api/attendance/history?{query}').status_code == 400
@@ -0,0 +1,106 @@
+import json
+import pytest
+import sqlite3
+import time
+import metrics
+from attendance_writer import AttendanceWriter
+
+class FlakyDatabase:
+    """Stands in for AttendanceDB, raising the queued errors before delegating to the real one"""
+
+    def __init__(self, database, errors):
+        self.database = database
+        self.errors = list(errors)
+        self.calls = 0
+
+    def log_recognitions(self, entries):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.database.log_recognitions(entries)
+
+def spooled(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def make_writer(database, tmp_path, errors=()):
+    return AttendanceWriter(FlakyDatabase(database, errors), spool_path=str(tmp_path / "spool.jsonl"),
+                            flush_interval=0.05, initial_backoff=0.001, max_backoff=0.002)
+
+def test_locked_database_is_retried(database, tmp_path):
+    database.add_student("Anshika")
+    writer = make_writer(database, tmp_path, [sqlite3.OperationalError("database is locked")] * 2)
+    writer.start()
+    writer.log("Anshika")
+    writer.close()
+
+    assert (writer.logged, writer.retries, writer.failed) == (1, 2, 0)
+    assert spooled(writer.spool_path) == []
+    assert list(database.get_today_attendance()) == ["Anshika"]
+
+def test_unexpected_errors_keep_the_spool_and_the_thread(database, tmp_path):
+    database.add_student("Anshika")
+    database.add_student("Harini")
+    writer = make_writer(database, tmp_path, [sqlite3.IntegrityError("constraint failed")])
+    writer.start()
+    writer.log("Anshika")
+    deadline = time.monotonic() + 5
+    while not writer.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.log("Harini")
+    writer.close()
+
+    assert (writer.failed, writer.logged) == (1, 1)
+    assert list(database.get_today_attendance()) == ["Harini"]
+    # Only the failed recognition is kept for the next run to replay
+    assert [record['student_name'] for record in spooled(writer.spool_path)] == ["Anshika"]
+
+def test_spool_is_replayed_on_start(database, tmp_path):
+    database.add_student("Anshika")
+    database.add_student("Harini")
+    spool = tmp_path / "spool.jsonl"
+    spool.write_text(
+        json.dumps({'student_name': "Anshika", 'status': 'present', 'timestamp': '2026-09-07 08:30:00'}) + "\n"
+        + json.dumps({'student_name': "Harini"}) + "\n"
+        + '{"student_name": "Har'
+    )
+    writer = make_writer(database, tmp_path)
+    assert writer.replayed == 1
+    writer.start()
+    writer.close()
+
+    assert writer.logged == 1
+    assert spooled(spool) == []
+    history = database.get_attendance_history("Anshika", days=100000)
+    assert [row['timestamp'] for row in history] == ['2026-09-07 08:30:00']
+
+def test_writer_metrics_are_exported(database, tmp_path):
+    writer = make_writer(database, tmp_path)
+    text = metrics.REGISTRY.render()
+    for name in ('attendance_writer_queue_depth', 'attendance_writer_flush_seconds',
+                 'attendance_writer_retries_total', 'attendance_writer_records_total'):
+        assert f"# TYPE {name} " in text
+    writer.close()
+
+def test_a_spool_in_use_is_refused(database, tmp_path):
+    writer = make_writer(database, tmp_path)
+    with pytest.raises(RuntimeError):
+        make_writer(database, tmp_path)
+    writer.close()
+    make_writer(database, tmp_path).close()
+
+def test_spool_does_not_grow_after_a_failure(database, tmp_path):
+    for name in ("Anshika", "Harini", "Nithya"):
+        database.add_student(name)
+    writer = make_writer(database, tmp_path, [sqlite3.IntegrityError("constraint failed")])
+    writer.start()
+    writer.log("Anshika")
+    deadline = time.monotonic() + 5
+    while not writer.failed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.log("Harini")
+    writer.log("Nithya")
+    writer.close()
+
+    assert writer.failed == 1
+    assert [record['student_name'] for record in spooled(writer.spool_path)] == ["Anshika"]
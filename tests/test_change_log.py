@@ -0,0 +1,30 @@
+from database import CHANGE_LOG_SIZE
+
+def test_attendance_changes_are_logged(database):
+    student_id = database.add_student("Anshika")
+    database.log_attendance("Anshika")
+    conn = database.get_connection()
+    with conn:
+        conn.execute("UPDATE attendance SET status = 'late' WHERE student_id = ?", (student_id,))
+        conn.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
+
+    changes = database.get_changes_since(0)
+    assert [(change['change'], change['student_name'], change['status']) for change in changes] == [
+        ('insert', "Anshika", 'present'), ('update', "Anshika", 'late'), ('delete', "Anshika", 'late')]
+    assert database.get_latest_change_id() == changes[-1]['id']
+    assert database.get_changes_since(changes[0]['id'], limit=1) == [changes[1]]
+
+def test_change_log_keeps_the_newest_entries_without_any_stream(database):
+    student_id = database.add_student("Anshika")
+    conn = database.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO attendance_changes (change, attendance_id, student_id) VALUES ('insert', ?, ?)",
+            [(i, student_id) for i in range(CHANGE_LOG_SIZE + 5)]
+        )
+    # A recognizer writing attendance prunes the log too
+    database.log_attendance("Anshika")
+
+    latest = database.get_latest_change_id()
+    assert conn.execute("SELECT COUNT(*), MIN(id) FROM attendance_changes").fetchone() == (
+        CHANGE_LOG_SIZE, latest - CHANGE_LOG_SIZE + 1)
@@ -0,0 +1,120 @@
+import random
+from database import _counter_rebuild_statements, _rollup_rebuild_statements, ROLLUPS
+
+def snapshot(conn):
+    """Every rollup table and the per-student counters, in a comparable form"""
+    tables = [table for table, _, _ in ROLLUPS] + ['student_counters']
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2").fetchall() for table in tables}
+
+def assert_matches_rebuild(database):
+    conn = database.get_connection()
+    maintained = snapshot(conn)
+    with conn:
+        for statement in _rollup_rebuild_statements() + _counter_rebuild_statements():
+            conn.execute(statement)
+    assert maintained == snapshot(conn)
+
+def insert(conn, student_id, timestamp, status='present'):
+    with conn:
+        return conn.execute("INSERT INTO attendance (student_id, timestamp, status) VALUES (?, ?, ?)",
+                            (student_id, timestamp, status)).lastrowid
+
+def test_triggers_match_rebuild_through_inserts_updates_and_deletes(database):
+    conn = database.get_connection()
+    anshika = database.add_student("Anshika")
+    harini = database.add_student("Harini")
+    nithya = database.add_student("Nithya")
+
+    first = insert(conn, anshika, '2026-09-01 08:30:00')
+    insert(conn, anshika, '2026-09-02 10:15:00')
+    absence = insert(conn, anshika, '2026-09-03 08:00:00', 'absent')
+    moved = insert(conn, anshika, '2026-09-07 10:30:00')
+    insert(conn, harini, '2026-09-01 09:00:00')
+    assert_matches_rebuild(database)
+
+    with conn:
+        conn.execute("UPDATE attendance SET status = 'present' WHERE id = ?", (absence,))
+    assert_matches_rebuild(database)
+
+    with conn:
+        conn.execute("UPDATE attendance SET timestamp = '2026-09-08 11:00:00' WHERE id = ?", (first,))
+    assert_matches_rebuild(database)
+
+    # Nithya has no counter row until this update moves a row to her
+    with conn:
+        conn.execute("UPDATE attendance SET student_id = ? WHERE id = ?", (nithya, moved))
+    assert conn.execute("SELECT last_present FROM student_counters WHERE student_id = ?",
+                        (nithya,)).fetchone() == ('2026-09-07 10:30:00',)
+    assert_matches_rebuild(database)
+
+    # Moving her only row away again leaves no counters behind
+    with conn:
+        conn.execute("UPDATE attendance SET student_id = ? WHERE id = ?", (harini, moved))
+    assert_matches_rebuild(database)
+
+    with conn:
+        conn.execute("DELETE FROM attendance WHERE id = ?", (absence,))
+        conn.execute("DELETE FROM attendance WHERE student_id = ?", (harini,))
+    assert_matches_rebuild(database)
+
+def test_triggers_match_rebuild_after_random_edits(database):
+    rng = random.Random(0)
+    conn = database.get_connection()
+    students = [database.add_student(name) for name in ("Abhinaya", "Anshika", "Harini", "Nithya", "Saima")]
+    for _ in range(300):
+        ids = [row[0] for row in conn.execute("SELECT id FROM attendance")]
+        action = rng.choice(['insert', 'insert', 'status', 'timestamp', 'move', 'delete']) if ids else 'insert'
+        timestamp = f"2026-{rng.randint(8, 10):02d}-{rng.randint(1, 28):02d} {rng.randint(7, 11):02d}:{rng.randint(0, 59):02d}:00"
+        with conn:
+            if action == 'insert':
+                conn.execute("INSERT INTO attendance (student_id, timestamp, status) VALUES (?, ?, ?)",
+                             (rng.choice(students), timestamp, rng.choice(['present', 'present', 'absent', 'late'])))
+            elif action == 'status':
+                conn.execute("UPDATE attendance SET status = ? WHERE id = ?",
+                             (rng.choice(['present', 'absent', 'late']), rng.choice(ids)))
+            elif action == 'timestamp':
+                conn.execute("UPDATE attendance SET timestamp = ? WHERE id = ?", (timestamp, rng.choice(ids)))
+            elif action == 'move':
+                conn.execute("UPDATE attendance SET student_id = ? WHERE id = ?", (rng.choice(students), rng.choice(ids)))
+            else:
+                conn.execute("DELETE FROM attendance WHERE id = ?", (rng.choice(ids),))
+    assert_matches_rebuild(database)
+
+def test_stats_read_the_counters(database):
+    conn = database.get_connection()
+    student_id = database.add_student("Anshika")
+    insert(conn, student_id, '2026-09-01 08:30:00')
+    insert(conn, student_id, '2026-09-02 08:30:00', 'absent')
+    insert(conn, student_id, '2026-09-03 10:30:00')
+    insert(conn, student_id, '2026-09-04 09:00:00')
+
+    stats = database.get_student_stats("Anshika")
+    assert (stats['present_days'], stats['total_days']) == (3, 4)
+    assert (stats['current_streak'], stats['late_arrivals']) == (2, 1)
+    assert stats['last_present_date'] == '2026-09-04'
+
+def test_weekly_stats_count_only_the_last_84_days(database):
+    conn = database.get_connection()
+    students = [database.add_student(name) for name in ("Anshika", "Harini")]
+    rng = random.Random(0)
+    with conn:
+        # Every day around the window start, at times either side of the current time of day
+        for days_ago in list(range(78, 95)) + rng.sample(range(0, 78), 20):
+            for offset in ('-3 hours', '+3 hours'):
+                conn.execute(
+                    "INSERT INTO attendance (student_id, timestamp, status) "
+                    "VALUES (?, datetime('now', ?, ?), ?)",
+                    (rng.choice(students), f'-{days_ago} days', offset, rng.choice(['present', 'absent']))
+                )
+
+    for student_id, stats in zip(students, (database.get_student_stats("Anshika"),
+                                            database.get_student_stats("Harini"))):
+        # The per-student query the stats used before the weekly rollup existed
+        expected = conn.execute('''
+            SELECT strftime('%Y-W%W', timestamp) AS week, COUNT(*), SUM(status = 'present')
+            FROM attendance
+            WHERE student_id = ? AND timestamp >= datetime('now', '-84 days')
+            GROUP BY week
+            ORDER BY week DESC
+        ''', (student_id,)).fetchall()
+        assert stats['weekly_data'] == expected
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from embedding_cache import EmbeddingCache
+
+class CountingEmbedder:
+    """Embeds a photo as its bytes' length, remembering which paths it was asked for"""
+
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, path):
+        self.paths.append(path)
+        with open(path, 'rb') as f:
+            return np.full(4, len(f.read()), dtype=np.float32)
+
+def make_folder(root, name, photos):
+    folder = root / name
+    folder.mkdir()
+    for filename, content in photos.items():
+        (folder / filename).write_bytes(content)
+    return folder
+
+def test_unchanged_photos_are_not_embedded_again(tmp_path):
+    folder = make_folder(tmp_path, "known_faces", {"Anshika.jpg": b"a" * 3, "Harini.jpg": b"h" * 5, "notes.txt": b""})
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    embed = CountingEmbedder()
+
+    first = cache.sync(str(folder), embed)
+    assert sorted(first) == ["Anshika.jpg", "Harini.jpg"]
+    assert len(embed.paths) == 2
+
+    (folder / "Harini.jpg").write_bytes(b"h" * 7)
+    second = EmbeddingCache(str(tmp_path / "cache")).sync(str(folder), embed)
+    assert embed.paths[2:] == [os.path.join(os.path.abspath(str(folder)), "Harini.jpg")]
+    assert second["Anshika.jpg"][0] == 3 and second["Harini.jpg"][0] == 7
+
+def test_photos_are_keyed_by_absolute_path(tmp_path):
+    door = make_folder(tmp_path, "door", {"Anshika.jpg": b"a" * 3})
+    lab = make_folder(tmp_path, "lab", {"Anshika.jpg": b"a" * 9})
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    embed = CountingEmbedder()
+
+    assert cache.sync(str(door), embed)["Anshika.jpg"][0] == 3
+    assert cache.sync(str(lab), embed)["Anshika.jpg"][0] == 9
+    # Both folders stay cached side by side
+    assert cache.sync(str(door), embed)["Anshika.jpg"][0] == 3
+    assert len(embed.paths) == 2
+
+def test_another_model_version_starts_over(tmp_path):
+    folder = make_folder(tmp_path, "known_faces", {"Anshika.jpg": b"a"})
+    embed = CountingEmbedder()
+    EmbeddingCache(str(tmp_path / "cache"), model_version='deepface-1').sync(str(folder), embed)
+    EmbeddingCache(str(tmp_path / "cache"), model_version='deepface-2').sync(str(folder), embed)
+    assert len(embed.paths) == 2
+
+def test_unreadable_or_inconsistent_cache_is_rebuilt(tmp_path):
+    folder = make_folder(tmp_path, "known_faces", {"Anshika.jpg": b"a", "Harini.jpg": b"hh"})
+    cache = EmbeddingCache(str(tmp_path / "cache"))
+    embed = CountingEmbedder()
+    cache.sync(str(folder), embed)
+
+    # Paths that do not line up with the matrix rows are never trusted
+    entries, matrix = cache._load()
+    paths = sorted(entries, key=lambda path: entries[path][2])
+    cache._save(paths, [0, 0], [0, 0], matrix[:1])
+    assert cache.sync(str(folder), embed)["Harini.jpg"][0] == 2
+
+    with open(cache.cache_path, 'wb') as f:
+        f.write(b"not a cache")
+    assert cache.sync(str(folder), embed)["Anshika.jpg"][0] == 1
+    assert len(embed.paths) == 6
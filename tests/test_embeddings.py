@@ -0,0 +1,62 @@
+import os
+import numpy as np
+import enroll
+import main
+
+def embedding_record(name, value, folder=None):
+    return {'student_name': name, 'photo_filename': f"{name}.jpg", 'photo_folder': folder,
+            'embedding': np.full(4, value, dtype=np.float32).tobytes(), 'photo_size': 10, 'photo_mtime_ns': 1}
+
+def names(database, version=None):
+    return [name for name, _ in database.get_embeddings('Facenet512', version)]
+
+def test_embeddings_are_filtered_by_model_version(database):
+    database.enroll_students([embedding_record("Anshika", 1)], 'Facenet512', 'deepface-0.0.90')
+    database.enroll_students([embedding_record("Harini", 2)], 'Facenet512', 'deepface-0.0.93')
+
+    assert names(database, 'deepface-0.0.93') == ["Harini"]
+    assert list(database.get_enrolled_photos('Facenet512', 'deepface-0.0.93')) == ["Harini.jpg"]
+    assert len(database.get_embeddings('Facenet512')) == 2
+
+def test_pruning_only_touches_the_given_folder(database):
+    database.enroll_students([embedding_record("Anshika", 1, "/photos/a"), embedding_record("Harini", 2, "/photos/a"),
+                              embedding_record("Nithya", 3, "/photos/b")], 'Facenet512')
+
+    assert database.remove_missing_photos('Facenet512', "/photos/a", ["Harini.jpg"]) == 1
+    assert names(database) == ["Harini", "Nithya"]
+    assert database.remove_missing_photos('Facenet512', "/photos/c", []) == 0
+    assert names(database) == ["Harini", "Nithya"]
+
+def test_prune_refuses_an_empty_folder(database, tmp_path):
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    database.enroll_students([embedding_record("Anshika", 1, str(folder))], 'Facenet512')
+
+    assert enroll.prune(str(folder)) == 0
+    assert names(database) == ["Anshika"]
+
+    (folder / "Harini.jpg").write_bytes(b"photo")
+    assert enroll.prune(str(folder)) == 1
+    assert names(database) == []
+
+def test_sync_stores_the_model_version_and_keeps_removed_photos(database, tmp_path, monkeypatch):
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    for name in ("Anshika", "Harini"):
+        (folder / f"{name}.jpg").write_bytes(b"photo")
+    monkeypatch.setattr(main, 'model_version', lambda: 'deepface-test')
+    monkeypatch.setattr(main, 'load_known_faces', lambda folder: {
+        filename: np.ones(4, dtype=np.float32) for filename in os.listdir(folder)})
+
+    assert main.sync_embeddings_to_db(str(folder)) == 2
+    assert main.sync_embeddings_to_db(str(folder)) == 0
+    assert set(database.get_enrolled_photos('Facenet512', 'deepface-test')) == {"Anshika.jpg", "Harini.jpg"}
+
+    # Starting a recognizer never deletes embeddings, even for photos that are gone
+    (folder / "Harini.jpg").unlink()
+    main.sync_embeddings_to_db(str(folder))
+    assert names(database, 'deepface-test') == ["Anshika", "Harini"]
+
+    # A new DeepFace version embeds every photo again
+    monkeypatch.setattr(main, 'model_version', lambda: 'deepface-next')
+    assert main.sync_embeddings_to_db(str(folder)) == 1
@@ -0,0 +1,93 @@
+import glob
+import os
+import sys
+import numpy as np
+import pytest
+import export_attendance
+from export_attendance import export_attendance as export_rows, export_daily_rollup, load_state
+
+def load_chunks(folder, fmt='npz'):
+    """Concatenate every chunk in folder back into {column: list of values}, decoding string codes"""
+    columns = {}
+    for path in sorted(glob.glob(os.path.join(folder, f"part-*.{fmt}"))):
+        with np.load(path) as chunk:
+            for name in chunk.files:
+                if name.endswith('_categories'):
+                    continue
+                values = chunk[name]
+                if f"{name}_categories" in chunk.files:
+                    values = chunk[f"{name}_categories"][values]
+                columns.setdefault(name, []).extend(values.tolist())
+    return columns
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['export_attendance.py', *args])
+    export_attendance.main()
+
+@pytest.fixture
+def attendance(database):
+    for name in ("Anshika", "Harini"):
+        database.add_student(name)
+    database.log_recognitions([
+        ("Anshika", 'present', '2026-09-01 08:30:00'),
+        ("Harini", 'late', '2026-09-01 09:10:00'),
+        ("Anshika", 'present', '2026-09-02 10:25:00'),
+    ])
+    return database
+
+def test_npz_export_round_trips(attendance, tmp_path):
+    written, last_id = export_rows(str(tmp_path), 'npz', batch_size=2)
+    assert written == 3
+    assert len(glob.glob(str(tmp_path / "attendance" / "part-*.npz"))) == 2
+
+    columns = load_chunks(tmp_path / "attendance")
+    assert columns['student_name'] == ["Anshika", "Harini", "Anshika"]
+    assert columns['status'] == ['present', 'late', 'present']
+    assert [str(value) for value in np.array(columns['day'], dtype='datetime64[D]')] == [
+        '2026-09-01', '2026-09-01', '2026-09-02']
+    assert columns['id'][-1] == last_id
+    assert load_state(str(tmp_path))['last_attendance_id'] == last_id
+
+def test_npz_daily_rollup_round_trips(attendance, tmp_path):
+    assert export_daily_rollup(str(tmp_path), 'npz') == 3
+
+    columns = load_chunks(tmp_path / "attendance_daily")
+    assert list(zip(columns['student_name'], columns['records'], columns['present'], columns['late'])) == [
+        ("Anshika", 1, 1, 0), ("Anshika", 1, 1, 1), ("Harini", 1, 0, 0)]
+
+def test_incremental_export_resumes_after_the_last_id(attendance, tmp_path, monkeypatch):
+    output = str(tmp_path / "exports")
+    run(monkeypatch, output)
+    first_last_id = load_state(output)['last_attendance_id']
+
+    attendance.log_recognitions([("Harini", 'present', '2026-09-02 08:40:00')])
+    run(monkeypatch, output, '--incremental')
+
+    state = load_state(output)
+    assert state['format'] == 'npz'
+    assert state['last_attendance_id'] > first_last_id
+    columns = load_chunks(os.path.join(output, "attendance"))
+    assert columns['student_name'] == ["Anshika", "Harini", "Anshika", "Harini"]
+    assert len(set(columns['id'])) == 4
+
+    # Nothing new: the state is kept and no chunk is added
+    run(monkeypatch, output, '--incremental')
+    assert load_state(output)['last_attendance_id'] == state['last_attendance_id']
+    assert len(glob.glob(os.path.join(output, "attendance", "part-*.npz"))) == 2
+
+def test_incremental_export_refuses_a_different_format(attendance, tmp_path, monkeypatch):
+    run(monkeypatch, str(tmp_path))
+    with pytest.raises(SystemExit):
+        run(monkeypatch, str(tmp_path), '--format', 'parquet', '--incremental')
+
+def test_parquet_export_round_trips(attendance, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    written, _ = export_rows(str(tmp_path), 'parquet')
+    assert written == 3
+    assert export_daily_rollup(str(tmp_path), 'parquet') == 3
+
+    table = pq.read_table(glob.glob(str(tmp_path / "attendance" / "part-*.parquet"))[0])
+    assert table.column('student_name').to_pylist() == ["Anshika", "Harini", "Anshika"]
+    assert table.column('status').to_pylist() == ['present', 'late', 'present']
+    daily = pq.read_table(glob.glob(str(tmp_path / "attendance_daily" / "part-*.parquet"))[0])
+    assert daily.column('late').to_pylist() == [0, 1, 0]
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from face_index import FaceGallery, IVFIndex
+
+def random_faces(count, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"student_{i}.jpg": rng.standard_normal(dim).astype(np.float32) for i in range(count)}
+
+def noisy(vectors, seed=1, scale=0.1):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors + scale * np.random.default_rng(seed).standard_normal(vectors.shape).astype(np.float32)
+
+def test_gallery_matches_the_closest_face():
+    faces = random_faces(50)
+    gallery = FaceGallery(faces)
+    name, distance = gallery.match(noisy([faces["student_7.jpg"]])[0])
+
+    assert name == "student_7.jpg"
+    assert distance < 0.3
+
+def test_gallery_reports_distance_when_nothing_is_under_threshold():
+    gallery = FaceGallery({"Anshika.jpg": np.array([1.0, 0.0], dtype=np.float32)})
+    name, distance = gallery.match(np.array([0.0, 1.0]))
+
+    assert name is None
+    assert distance == pytest.approx(1.0)
+
+def test_gallery_add_replaces_and_remove_deletes():
+    gallery = FaceGallery({"Anshika.jpg": np.array([1.0, 0.0]), "Ayush.jpg": np.array([0.0, 1.0])})
+    gallery.add("Anshika.jpg", np.array([-1.0, 0.0]))
+    assert len(gallery) == 2
+    assert gallery.match(np.array([-1.0, 0.0]))[0] == "Anshika.jpg"
+
+    gallery.remove("Ayush.jpg")
+    gallery.remove("Anshika.jpg")
+    assert len(gallery) == 0
+    assert gallery.match_batch([np.array([1.0, 0.0])]) == [(None, None)]
+
+    gallery.add("Ayush.jpg", np.array([0.0, 1.0]))
+    assert gallery.match(np.array([0.0, 1.0]))[0] == "Ayush.jpg"
+
+def test_gallery_from_rows_matches_the_dict_constructor():
+    faces = random_faces(10)
+    rows = [(name, vector.tobytes()) for name, vector in faces.items()]
+    from_rows, from_dict = FaceGallery.from_rows(rows), FaceGallery(faces)
+
+    assert from_rows.names == from_dict.names
+    np.testing.assert_allclose(from_rows.matrix, from_dict.matrix)
+
+def test_ivf_recall_against_the_exact_gallery():
+    faces = random_faces(2000)
+    gallery = FaceGallery(faces)
+    index = IVFIndex.from_gallery(gallery, n_probe=8)
+    queries = noisy(gallery.matrix[:200], scale=0.04)
+
+    exact = [name for name, _ in gallery.match_batch(queries, threshold=2.0)]
+    approximate = [name for name, _ in index.match_batch(queries, threshold=2.0)]
+    recall = np.mean([a == e for a, e in zip(approximate, exact)])
+
+    assert recall >= 0.9
+
+def test_ivf_probing_every_bucket_is_exact():
+    faces = random_faces(300)
+    gallery = FaceGallery(faces)
+    index = IVFIndex.from_gallery(gallery, n_lists=10, n_probe=10)
+    queries = noisy(gallery.matrix[:50], scale=0.1)
+
+    assert [name for name, _ in index.match_batch(queries)] == [name for name, _ in gallery.match_batch(queries)]
+
+def test_ivf_add_and_remove():
+    faces = random_faces(100)
+    index = IVFIndex.from_gallery(FaceGallery(faces), n_lists=5, n_probe=5)
+    new_face = np.random.default_rng(5).standard_normal(64).astype(np.float32)
+
+    index.add("new.jpg", new_face)
+    assert len(index) == 101
+    assert index.match(new_face)[0] == "new.jpg"
+
+    index.add("new.jpg", -new_face)
+    assert len(index) == 101
+    assert index.match(-new_face)[0] == "new.jpg"
+
+    index.remove("new.jpg")
+    index.remove("student_3.jpg")
+    assert len(index) == 99
+    assert "student_3.jpg" not in index.names
+    assert index.match(faces["student_3.jpg"])[0] != "student_3.jpg"
+
+def test_ivf_starts_empty_and_builds_on_first_add():
+    index = IVFIndex()
+    assert len(index) == 0
+    assert index.match_batch([np.ones(4)]) == [(None, None)]
+
+    index.add("Anshika.jpg", np.ones(4))
+    assert index.match(np.ones(4))[0] == "Anshika.jpg"
+
+def test_ivf_skips_empty_buckets():
+    faces = random_faces(40)
+    index = IVFIndex.from_gallery(FaceGallery(faces), n_lists=4, n_probe=4)
+    emptied = index._where["student_0.jpg"]
+    for name in list(index._list_names[emptied]):
+        index.remove(name)
+    remaining = index.names[0]
+
+    assert len(index._list_vectors[emptied]) == 0
+    assert index.match(faces[remaining])[0] == remaining
+
+def test_ivf_with_every_bucket_empty_matches_nothing():
+    index = IVFIndex.from_gallery(FaceGallery(random_faces(4)), n_lists=2)
+    for name in list(index.names):
+        index.remove(name)
+
+    assert index.match_batch([np.ones(64)]) == [(None, None)]
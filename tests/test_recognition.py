@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+import main
+from face_index import FaceGallery
+from main import FaceTracker, LatestFrameQueue, QualityGate, RecognitionWorker
+
+FACE = {'x': 40, 'y': 40, 'w': 120, 'h': 120, 'confidence': 0.99}
+
+class ListWriter:
+    def __init__(self):
+        self.logged = []
+
+    def log(self, student_name, status='present'):
+        self.logged.append(student_name)
+
+@pytest.fixture
+def embed_calls(monkeypatch):
+    """Replace the DeepFace calls: every frame shows the faces in `faces`, and every crop embeds as Anshika"""
+    calls = []
+    faces = [FACE]
+    monkeypatch.setattr(main, 'detect_faces', lambda frame: [dict(area) for area in faces])
+
+    def embed_crop(frame, area):
+        calls.append(area)
+        return np.ones(4, dtype=np.float32)
+    monkeypatch.setattr(main, 'embed_crop', embed_crop)
+    return calls, faces
+
+def sharp_frame():
+    return np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+
+def make_worker():
+    gallery = FaceGallery({"Anshika.jpg": np.ones(4, dtype=np.float32)})
+    return RecognitionWorker(gallery, LatestFrameQueue(), tracker=FaceTracker(), gate=QualityGate(),
+                             writer=ListWriter())
+
+def test_rejected_frames_before_detection_save_no_embedding(embed_calls):
+    worker = make_worker()
+    worker.process(np.zeros((240, 320, 3), dtype=np.uint8))
+
+    assert worker.gate.rejected == {'dark': 1}
+    assert worker.gate.inference_saved == 0
+
+def test_rejected_faces_count_as_saved_and_not_as_run(embed_calls):
+    calls, faces = embed_calls
+    faces[0] = dict(FACE, confidence=0.2)
+    worker = make_worker()
+    worker.process(sharp_frame())
+
+    assert calls == []
+    assert worker.gate.inference_saved == 1
+    assert (worker.tracker.embeddings_run, worker.tracker.embeddings_skipped) == (0, 0)
+
+def test_rejections_on_tracked_faces_are_not_checked(embed_calls):
+    calls, faces = embed_calls
+    worker = make_worker()
+    worker.process(sharp_frame())
+    # The tracker would skip this face anyway, so the gate never sees it
+    faces[0] = dict(FACE, confidence=0.2)
+    worker.process(sharp_frame())
+
+    assert len(calls) == 1
+    assert worker.gate.checked == 3
+    assert worker.gate.inference_saved == 0
+
+def test_match_face_counts_a_rejected_frame_as_saved():
+    gate = QualityGate()
+    result = main.match_face(np.zeros((240, 320, 3), dtype=np.uint8), {"Anshika.jpg": np.ones(4)}, gate=gate)
+
+    assert result == "⏭️ Skipped dark frame"
+    assert gate.inference_saved == 1
+
+def test_single_check_retries_rejected_frames_without_matching_them(monkeypatch, capsys):
+    dark = np.zeros((240, 320, 3), dtype=np.uint8)
+    frames = iter([dark, dark, dark, sharp_frame(), sharp_frame()])
+
+    class Capture:
+        def __init__(self, source):
+            pass
+
+        def read(self):
+            frame = next(frames, None)
+            return frame is not None, frame
+
+        def release(self):
+            pass
+
+    clock = iter(range(0, 1000))
+    monkeypatch.setattr(main.cv2, 'VideoCapture', Capture)
+    monkeypatch.setattr(main.cv2, 'imshow', lambda name, frame: None)
+    monkeypatch.setattr(main.cv2, 'waitKey', lambda delay: -1)
+    monkeypatch.setattr(main.cv2, 'destroyAllWindows', lambda: None)
+    monkeypatch.setattr(main.time, 'time', lambda: next(clock))
+    matched = []
+    monkeypatch.setattr(main, 'match_face', lambda frame, gallery, **kwargs: matched.append(frame) or "Face recognized")
+
+    main.run_single_check({})
+
+    out = capsys.readouterr().out
+    assert len(matched) == 1
+    assert out.count("Skipped dark frame") == 1
+    assert out.count("Matching face") == 1
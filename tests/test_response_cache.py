@@ -0,0 +1,57 @@
+import time
+from app import ResponseCache, response_cache
+
+def test_entries_expire_with_the_generation_or_the_ttl():
+    cache = ResponseCache(ttl=60)
+    cache.put('/api/stats/all', 1, b'{"students": []}')
+    assert cache.get('/api/stats/all', 1)[0] == b'{"students": []}'
+    assert cache.get('/api/stats/all', 2) is None
+
+    cache = ResponseCache(ttl=0.01)
+    cache.put('/api/stats/all', 1, b'{}')
+    time.sleep(0.02)
+    assert cache.get('/api/stats/all', 1) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    for key in ('a', 'b'):
+        cache.put(key, 1, b'{}')
+    cache.get('a', 1)
+    cache.put('c', 1, b'{}')
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None and cache.get('c', 1) is not None
+
+def test_generation_changes_with_students_and_attendance(database):
+    generations = [database.get_generation()]
+    database.add_student("Anshika")
+    generations.append(database.get_generation())
+    database.log_attendance("Anshika")
+    generations.append(database.get_generation())
+    assert len(set(generations)) == 3
+
+def test_cached_summary_follows_the_data_generation(client, database):
+    database.add_student("Anshika")
+    first = client.get('/api/attendance/summary')
+    etag = first.headers['ETag']
+    assert first.get_json()['total_students'] == 1
+
+    # Unchanged data: served from the cache, and a matching If-None-Match gets a 304
+    hits = response_cache.hits
+    assert client.get('/api/attendance/summary', headers={'If-None-Match': etag}).status_code == 304
+    assert response_cache.hits == hits + 1
+
+    generation = database.get_generation()
+    database.add_student("Harini")
+    assert database.get_generation() != generation
+
+    second = client.get('/api/attendance/summary', headers={'If-None-Match': etag})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != etag
+    assert second.get_json()['total_students'] == 2
+
+def test_cached_stats_change_after_logging_attendance(client, database):
+    database.add_student("Anshika")
+    assert client.get('/api/stats/all').get_json()['students'][0]['present_days'] == 0
+
+    assert client.post('/api/attendance/manual', json={'student_name': "Anshika"}).status_code == 200
+    assert client.get('/api/stats/all').get_json()['students'][0]['present_days'] == 1
@@ -0,0 +1,86 @@
+import numpy as np
+import main
+from face_index import FaceGallery
+from main import FaceTracker, LatestFrameQueue, QualityGate, RecognitionWorker
+
+def area(x, y, size=100):
+    return {'x': x, 'y': y, 'w': size, 'h': size}
+
+class ListWriter:
+    def __init__(self):
+        self.logged = []
+
+    def log(self, student_name, status='present'):
+        self.logged.append(student_name)
+
+def test_overlapping_detections_keep_their_track():
+    tracker = FaceTracker()
+    first = tracker.update([area(0, 0), area(300, 0)])
+    # Both faces move a little and come back in the other order
+    second = tracker.update([area(310, 5), area(10, 5)])
+
+    assert [track.track_id for track in second] == [first[1].track_id, first[0].track_id]
+    assert second[1].area == area(10, 5)
+
+def test_distant_detection_starts_a_new_track():
+    tracker = FaceTracker()
+    first = tracker.update([area(0, 0)])
+    second = tracker.update([area(200, 200)])
+
+    assert second[0].track_id != first[0].track_id
+    assert len(tracker.tracks) == 2
+
+def test_tracks_expire_after_max_missed_frames():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update([area(0, 0)])
+    tracker.update([])
+    tracker.update([])
+    assert len(tracker.tracks) == 1
+
+    tracker.update([])
+    assert tracker.tracks == []
+
+def test_confidence_decays_until_an_embedding_is_needed():
+    tracker = FaceTracker(confidence_decay=0.5, min_confidence=0.3)
+    track, = tracker.update([area(0, 0)])
+    assert tracker.needs_embedding(track)
+
+    tracker.identify(track, "Anshika", 0.1)
+    tracker.update([area(0, 0)])
+    assert track.confidence == 0.5 and not tracker.needs_embedding(track)
+    tracker.update([area(0, 0)])
+    assert track.confidence == 0.25 and tracker.needs_embedding(track)
+    assert (tracker.embeddings_run, tracker.embeddings_skipped) == (1, 1)
+
+def test_new_identity_resets_logged():
+    tracker = FaceTracker()
+    track, = tracker.update([area(0, 0)])
+    tracker.identify(track, "Anshika", 0.1)
+    track.logged = True
+
+    tracker.identify(track, "Anshika", 0.2)
+    assert track.logged
+    tracker.identify(track, "Ayush", 0.2)
+    assert not track.logged
+
+def test_tracked_faces_are_embedded_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, 'detect_faces', lambda frame: [dict(area(40, 40, 120), confidence=0.99)])
+
+    def embed_crop(frame, area):
+        calls.append(area)
+        return np.ones(4, dtype=np.float32)
+    monkeypatch.setattr(main, 'embed_crop', embed_crop)
+
+    gallery = FaceGallery({"Anshika.jpg": np.ones(4, dtype=np.float32)})
+    worker = RecognitionWorker(gallery, LatestFrameQueue(), tracker=FaceTracker(), gate=QualityGate(),
+                               writer=ListWriter())
+    frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    for _ in range(3):
+        results = worker.process(frame)
+
+    assert len(calls) == 1
+    assert results[0]['student_name'] == "Anshika"
+    assert worker.writer.logged == ["Anshika"]
+    assert (worker.tracker.embeddings_run, worker.tracker.embeddings_skipped) == (1, 2)
+    assert worker.gate.inference_saved == 0